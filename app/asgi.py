@@ -0,0 +1,221 @@
+# app/asgi.py
+from __future__ import annotations
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs
+import requests
+from flask import Flask
+from .config.leagues import tenant_config
+from .services import deadline, metrics
+from .services.espn import async_espn_client, prefetch_league
+from .services.events import ASGI_ENVIRON_KEY, league_feed, stream_async
+
+# API routes that never touch ESPN data (every other /api/ route may)
+NO_PREFETCH = ("/api/keeper_limits",)
+
+
+class AsgiApp:
+    """
+    Serve the Flask app (the same routes as wsgi.py) over ASGI.
+
+    Waiting on ESPN is what ties up gunicorn threads, so before an API request
+    is handed to Flask its tenant's league data is loaded into the snapshot
+    cache with the async ESPN client: any number of requests can wait there as
+    coroutines, sharing one upstream load per view. Flask then runs in a small
+    thread pool and finds everything cached, so threads are only busy for the
+    milliseconds of actual work.
+    """
+
+    def __init__(self, app: Flask, threads: int = 8):
+        self.app = app
+        self.threads = threads
+        self._pool: ThreadPoolExecutor | None = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix="asgi")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await async_espn_client(self.app.config).aclose()
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send) -> None:
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        if scope["path"] == "/api/events" and scope["method"] == "GET":
+            # never via Flask: _call_wsgi would buffer the whole stream
+            await self._events(scope, receive, send)
+            return
+        if scope["path"].startswith("/api/") and scope["path"] not in NO_PREFETCH:
+            try:
+                cfg = self._tenant(scope)
+            except (LookupError, ValueError):
+                cfg = None  # the route answers with the error
+            await self._prefetch(cfg)
+
+        if self._pool is None:  # server without lifespan support
+            self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix="asgi")
+        environ = self._environ(scope, bytes(body))
+        loop = asyncio.get_running_loop()
+        status, headers, chunks = await loop.run_in_executor(self._pool, self._call_wsgi, environ)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"".join(chunks)})
+
+    def _tenant(self, scope) -> Dict:
+        """Tenant config for ?league=&season= (raises like tenant_config)."""
+        args = parse_qs(scope["query_string"].decode("latin-1"))
+        return tenant_config(
+            self.app.config, (args.get("league") or [None])[0], (args.get("season") or [None])[0]
+        )
+
+    async def _prefetch(self, cfg) -> None:
+        if cfg is None or not cfg.get("LEAGUE_ID"):
+            return
+        try:
+            with deadline.budget(cfg.get("ESPN_REQUEST_BUDGET") or None):
+                await prefetch_league(cfg)
+        except (requests.RequestException, ValueError, LookupError):
+            # the sync path retries (or fails fast once the breaker is open)
+            metrics.inc("asgi_prefetch_errors_total")
+
+    @staticmethod
+    async def _send_json(send, status: int, body: Dict) -> None:
+        data = json.dumps(body).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(data)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": data})
+
+    async def _events(self, scope, receive, send) -> None:
+        """
+        /api/events without a thread per subscriber: each stream is a
+        coroutine fed by the tenant's LeagueFeed, so there is no stream cap or
+        lifetime limit here. Errors are answered as the Flask route would.
+        """
+        try:
+            cfg = self._tenant(scope)
+        except LookupError as e:
+            await self._send_json(send, 404, {"error": str(e)})
+            return
+        except ValueError as e:
+            await self._send_json(send, 400, {"error": str(e)})
+            return
+        await self._prefetch(cfg)
+        feed = league_feed(cfg)
+        try:
+            await asyncio.to_thread(feed.prime)
+        except Exception as e:
+            await self._send_json(send, 503, {"error": f"Failed to load ESPN data: {e}"})
+            return
+        last_id = dict(scope["headers"]).get(b"last-event-id")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+
+        async def pump():
+            async for chunk in stream_async(feed, last_id.decode("latin-1") if last_id else None):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        async def disconnected():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if tasks[1] not in done:  # the feed dropped us; the client reconnects
+            await send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    def _environ(scope, body: bytes) -> Dict:
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            # WSGI wants the raw bytes as latin-1, ASGI gives decoded UTF-8
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+            ASGI_ENVIRON_KEY: True,
+        }
+        for raw_name, raw_value in scope["headers"]:
+            name = raw_name.decode("latin-1").upper().replace("-", "_")
+            value = raw_value.decode("latin-1")
+            if name == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+                continue
+            if name == "CONTENT_LENGTH":
+                continue
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _call_wsgi(self, environ: Dict) -> Tuple[int, List[Tuple[bytes, bytes]], List[bytes]]:
+        started: List = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        result = self.app(environ, start_response)
+        try:
+            chunks = [c for c in result if c]
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        status, headers = started
+        return (
+            int(status.split(" ", 1)[0]),
+            [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+            chunks,
+        )
@@ -0,0 +1,155 @@
+# app/config/leagues.py
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from .team_map import TEAM_ID_MAP, SEASONS_KEPT_OVERRIDES
+from ..keeper import TEAMS, DEFAULT_RULES, KeeperRules
+
+log = logging.getLogger(__name__)
+
+# leagues-file key -> (config key, converter)
+_FIELDS = {
+    "name": ("LEAGUE_NAME", str),
+    "last_season": ("LAST_SEASON", int),
+    "season_finalized": ("SEASON_FINALIZED", bool),
+    "first_season": ("FIRST_SEASON", int),
+    "teams": ("TEAMS", list),
+    "team_id_map": ("TEAM_ID_MAP", lambda d: {int(k): v for k, v in d.items()}),
+    "seasons_kept_overrides": (
+        "SEASONS_KEPT_OVERRIDES", lambda d: {int(k): int(v) for k, v in d.items()}
+    ),
+    "keeper_rules": ("KEEPER_RULES", KeeperRules.from_dict),
+    "espn_swid": ("ESPN_SWID", str),
+    "espn_s2": ("ESPN_S2", str),
+}
+
+
+def load_leagues(path: str) -> Dict[str, Dict]:
+    """Parse a leagues file (see leagues.example.json) into per-league config overlays."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    leagues = {}
+    for league_id, spec in (raw.get("leagues") or {}).items():
+        overlay = {}
+        for key, value in spec.items():
+            if key not in _FIELDS:
+                raise ValueError(f"{path}: unknown key {key!r} for league {league_id}")
+            cfg_key, convert = _FIELDS[key]
+            overlay[cfg_key] = convert(value)
+        # changes whenever the league's entry is edited (see tenant_fingerprint)
+        overlay["LEAGUE_FINGERPRINT"] = hashlib.blake2b(
+            json.dumps(spec, sort_keys=True).encode(), digest_size=8
+        ).hexdigest()
+        leagues[str(league_id)] = overlay
+    return leagues
+
+
+# what a broken leagues file (bad JSON, bad values) raises from load_leagues
+LEAGUES_FILE_ERRORS = (OSError, ValueError, TypeError, AttributeError, KeyError)
+
+_loaded: Dict[str, Tuple[float, Dict[str, Dict]]] = {}
+# path -> mtime (None: unreadable) of the last version that failed to load,
+# so each broken version is logged once rather than on every request
+_failed: Dict[str, Optional[float]] = {}
+_loaded_lock = threading.Lock()
+
+
+def league_overlays(cfg) -> Dict[str, Dict]:
+    """
+    Leagues from cfg["LEAGUES_FILE"], reloaded when the file changes. While the
+    file is missing or broken the last version that loaded keeps being served
+    (none before the first good load), so an edit in progress can't take down
+    every request.
+    """
+    path = cfg.get("LEAGUES_FILE")
+    if not path:
+        return {}
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError as e:
+        return _last_good(path, None, e)
+    hit = _loaded.get(path)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    with _loaded_lock:
+        hit = _loaded.get(path)
+        if hit and hit[0] == mtime:
+            return hit[1]
+        if _failed.get(path) == mtime:
+            return hit[1] if hit else {}
+        try:
+            leagues = load_leagues(path)
+        except LEAGUES_FILE_ERRORS as e:
+            return _last_good(path, mtime, e)
+        _loaded[path] = (mtime, leagues)
+        _failed.pop(path, None)
+    return leagues
+
+
+def _last_good(path: str, mtime: Optional[float], error: Exception) -> Dict[str, Dict]:
+    hit = _loaded.get(path)
+    if path not in _failed or _failed[path] != mtime:
+        _failed[path] = mtime
+        log.error(
+            "Leagues file %s could not be loaded (%s); %s.", path, error,
+            "keeping the last good version" if hit else "serving the default league only",
+        )
+    return hit[1] if hit else {}
+
+
+def tenant_config(cfg, league: Optional[str] = None, season: Optional[int] = None) -> Dict:
+    """
+    Config for one (league, season) request, layered as:
+    app config -> the default league's team map/overrides -> leagues file entry.
+
+    LAST_SEASON becomes the requested season and CURRENT_SEASON keeps the
+    league's latest season, which is what SEASONS_KEPT_OVERRIDES describe, so
+    those only apply when the current season is requested. Raises LookupError
+    for leagues that aren't configured and ValueError for bad seasons.
+    """
+    default_league = str(cfg.get("LEAGUE_ID") or "")
+    league = str(league or default_league)
+    overlays = league_overlays(cfg)
+    if league != default_league and league not in overlays:
+        raise LookupError(f"League {league} is not configured.")
+
+    t = dict(cfg)
+    t["LEAGUE_ID"] = league
+    t["KEEPER_RULES"] = DEFAULT_RULES
+    t["LEAGUE_FINGERPRINT"] = ""
+    if league == default_league:
+        t.update(TEAMS=TEAMS, TEAM_ID_MAP=TEAM_ID_MAP, SEASONS_KEPT_OVERRIDES=SEASONS_KEPT_OVERRIDES)
+    else:
+        # never leak the default league's team keys or keeper history
+        t.update(TEAMS=[], TEAM_ID_MAP={}, SEASONS_KEPT_OVERRIDES={}, SEASON_FINALIZED=False,
+                 FIRST_SEASON=None)
+    t.update(overlays.get(league, {}))
+
+    current = int(t["LAST_SEASON"])
+    if season is not None:
+        try:
+            season = int(season)
+        except (TypeError, ValueError):
+            raise ValueError("Season must be a year, e.g. 2024.") from None
+        if not 2000 <= season <= current:
+            raise ValueError(f"Season must be between 2000 and {current}.")
+        if season != current:
+            t["SEASONS_KEPT_OVERRIDES"] = {}
+    t["CURRENT_SEASON"] = current
+    t["LAST_SEASON"] = season or current
+    return t
+
+
+def tenant_fingerprint(cfg) -> str:
+    """
+    Changes whenever the tenant's leagues-file entry is edited. State built
+    from a tenant config (player indexes, eligibility tables, refresh jobs,
+    shared snapshots, event feeds) is tagged with it, so a hot-reloaded
+    leagues file takes effect instead of being shadowed by state built from
+    the old entry.
+    """
+    return cfg.get("LEAGUE_FINGERPRINT", "")
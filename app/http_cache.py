@@ -0,0 +1,101 @@
+# app/http_cache.py
+from __future__ import annotations
+import gzip
+import hashlib
+from typing import Callable, Hashable
+from flask import Response, current_app, request
+from .services.cache import LRU
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# (snapshot version, path + query) -> ETag of the body last built for it
+_etags = LRU(maxsize=1024)
+# (ETag, content-encoding) -> compressed body
+_compressed = LRU(maxsize=256)
+
+COMPRESSIBLE = ("application/json", "text/csv", "text/html")
+
+
+def _not_modified(etag: str, cache_control: str) -> Response:
+    resp = Response(status=304)
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = cache_control
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def conditional(
+    build: Callable[[], Response], cache_control: str, version: Hashable = None
+) -> Response:
+    """
+    Serve build() with a weak ETag of its body and the given Cache-Control,
+    answering a matching If-None-Match with 304.
+
+    With a snapshot version the ETag is also remembered per (version, URL), so
+    repeat visitors get their 304 without the body being rebuilt. The ETag
+    itself always comes from the body, so every worker hands out the same one.
+    """
+    key = None
+    if version is not None:
+        key = (version, request.full_path)
+        etag = _etags.get(key)
+        if etag and request.if_none_match.contains_weak(etag):
+            return _not_modified(etag, cache_control)
+
+    resp = build()
+    if resp.status_code != 200:
+        return resp
+    etag = hashlib.blake2b(resp.get_data(), digest_size=12).hexdigest()
+    if key is not None:
+        _etags.put(key, etag)
+    if request.if_none_match.contains_weak(etag):
+        return _not_modified(etag, cache_control)
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = cache_control
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def compress(resp: Response) -> Response:
+    """
+    after_request hook: brotli (when installed) or gzip for text bodies of at
+    least HTTP_COMPRESS_MIN_BYTES (0 disables). Bodies with an ETag are only
+    compressed once per encoding.
+    """
+    min_bytes = current_app.config.get("HTTP_COMPRESS_MIN_BYTES", 1024)
+    if (
+        not min_bytes
+        or resp.status_code != 200
+        or resp.direct_passthrough
+        or resp.is_streamed
+        or "Content-Encoding" in resp.headers
+        or resp.mimetype not in COMPRESSIBLE
+    ):
+        return resp
+    resp.vary.add("Accept-Encoding")
+    accept = request.accept_encodings
+    if brotli is not None and accept["br"]:
+        encoding = "br"
+    elif accept["gzip"]:
+        encoding = "gzip"
+    else:
+        return resp
+    body = resp.get_data()
+    if len(body) < min_bytes:
+        return resp
+
+    etag, _ = resp.get_etag()
+    data = _compressed.get((etag, encoding)) if etag else None
+    if data is None:
+        if encoding == "br":
+            data = brotli.compress(body, quality=5)
+        else:
+            data = gzip.compress(body, compresslevel=6)
+        if etag:
+            _compressed.put((etag, encoding), data)
+    resp.set_data(data)
+    resp.headers["Content-Encoding"] = encoding
+    return resp
@@ -1,7 +1,9 @@
 
 from __future__ import annotations
+import heapq
+import itertools
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple, List
+from typing import Dict, Iterable, Optional, Tuple, List
 
 # League teams shown in the dropdown
 TEAMS = [
@@ -19,6 +21,13 @@ TEAMS = [
 TEAM_INDEX: Dict[str, str] = {t["id"]: t["name"] for t in TEAMS}
 
 class PlayerRec:
+    # slotted: one of these per rostered player per snapshot per worker, and a
+    # per-instance __dict__ would be most of its size
+    __slots__ = (
+        "player_id", "name", "final_team_id", "espn_team_id", "draft_round",
+        "originally_undrafted", "seasons_kept", "points",
+    )
+
     def __init__(self, player_id: int, name: str):
         self.player_id = player_id
         self.name = name
@@ -27,6 +36,10 @@ class PlayerRec:
         self.draft_round: Optional[int] = None
         self.originally_undrafted: bool = False
         self.seasons_kept: int = 0
+        self.points: Optional[float] = None  # ESPN season fantasy points total
+
+    def __repr__(self) -> str:
+        return f"PlayerRec({self.player_id}, {self.name!r}, team={self.final_team_id!r}, round={self.draft_round})"
 
 @dataclass
 class Verdict:
@@ -41,6 +54,68 @@ class KeeperSelection:
     team_key: str
     keepers: List[Dict]  # List of {player_id, name, bucket, draft_round, cost_round}
 
+@dataclass
+class KeeperSet:
+    value: float
+    keepers: List[Dict]  # same shape as KeeperSelection.keepers, plus "value"
+
+    @property
+    def cost_rounds(self) -> List[int]:
+        return [k["cost_round"] for k in self.keepers]
+
+@dataclass(frozen=True)
+class RoundBucket:
+    label: str
+    first_round: int
+    last_round: int
+    limit: int = 1
+
+@dataclass(frozen=True)
+class KeeperRules:
+    """Keeper rules for one league. The defaults are this league's rules."""
+    buckets: Tuple[RoundBucket, ...] = (RoundBucket("1-10", 1, 10), RoundBucket("11-18", 11, 18))
+    waiver_limit: int = 1
+    max_keepers: int = 3
+    waiver_cost: int = 9
+    waiver_bumped_cost: int = 10  # waiver cost when another keeper already costs waiver_cost
+    unknown_round_cost: int = 16
+    max_seasons_kept: int = 1  # kept this many seasons in a row -> can't be kept again
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "KeeperRules":
+        """Build from a leagues-file "keeper_rules" object; missing keys keep defaults."""
+        d = dict(d)
+        if "buckets" in d:
+            d["buckets"] = tuple(RoundBucket(**b) for b in d["buckets"])
+        return cls(**d)
+
+    def limits(self) -> Dict[str, int]:
+        out = {b.label: b.limit for b in self.buckets}
+        out["waiver"] = self.waiver_limit
+        return out
+
+    def bucket_for_round(self, rd: int) -> Optional[RoundBucket]:
+        for b in self.buckets:
+            if b.first_round <= rd <= b.last_round:
+                return b
+        return None
+
+    def describe(self) -> List[str]:
+        lines = [f"Maximum {self.max_keepers} keepers total"]
+        lines += [f"{b.limit} keeper from rounds {b.label}" for b in self.buckets]
+        lines.append(f"{self.waiver_limit} waiver wire keeper (undrafted players)")
+        if self.max_seasons_kept == 1:
+            lines.append("Players kept last year cannot be kept again")
+        else:
+            lines.append(f"Players cannot be kept more than {self.max_seasons_kept} seasons in a row")
+        return lines
+
+DEFAULT_RULES = KeeperRules()
+
+def _ordinal(n: int) -> str:
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
 def check_final_roster(rec: PlayerRec, selected_team_key: str) -> Tuple[bool, str]:
     if rec.final_team_id is None:
         return False, "Final roster team mapping unknown for this league. Please map ESPN team IDs to your team keys in config/team_map.py."
@@ -48,35 +123,42 @@ def check_final_roster(rec: PlayerRec, selected_team_key: str) -> Tuple[bool, st
         return False, "Not on your final roster last season for this team."
     return True, "Player was on your final roster last season."
 
-def keeper_verdict(rec: PlayerRec) -> Tuple[bool, str, Optional[str]]:
+def keeper_verdict(rec: PlayerRec, rules: KeeperRules = DEFAULT_RULES) -> Tuple[bool, str, Optional[str]]:
     # Rule: players who were kept last year cannot be kept this year
-    if rec.seasons_kept >= 1:
-        return False, "Ineligible: this player was kept last year and cannot be kept again this year.", None
+    if rec.seasons_kept >= rules.max_seasons_kept:
+        if rules.max_seasons_kept == 1:
+            return False, "Ineligible: this player was kept last year and cannot be kept again this year.", None
+        return False, (
+            f"Ineligible: this player has been kept {rec.seasons_kept} seasons in a row and cannot be kept again this year."
+        ), None
 
     # Waiver path (truly undrafted)
     if rec.originally_undrafted:
+        cost, bumped = _ordinal(rules.waiver_cost), _ordinal(rules.waiver_bumped_cost)
         return True, (
-            "Eligible as a Waiver Wire keeper. Default cost = 9th; becomes 10th if your other keeper uses a 9th."
+            f"Eligible as a Waiver Wire keeper. Default cost = {cost}; becomes {bumped} if your other keeper uses a {cost}."
         ), "waiver"
 
     # Drafted path
     if rec.draft_round is None:
         return False, "Insufficient data: original draft round unknown.", None
     rd = rec.draft_round
-    if 1 <= rd <= 10:
-        return True, f"Eligible as a Rounds 1–10 keeper (original round {rd}).", "1-10"
-    if 11 <= rd <= 18:
-        return True, f"Eligible as a Rounds 11–18 keeper (original round {rd}).", "11-18"
-    # Players from round 19+ are eligible but don't fit into the bucket system
-    return True, f"Eligible as a keeper (original round {rd}), but doesn't fit bucket limits (1-10, 11-18, waiver).", None
-
-def can_add_to_keepers(rec: PlayerRec, current_selection: KeeperSelection) -> Tuple[bool, str, Optional[str]]:
+    b = rules.bucket_for_round(rd)
+    if b:
+        return True, f"Eligible as a Rounds {b.first_round}–{b.last_round} keeper (original round {rd}).", b.label
+    # Players outside every round bucket are eligible but don't fit into the bucket system
+    labels = ", ".join(list(rules.limits()))
+    return True, f"Eligible as a keeper (original round {rd}), but doesn't fit bucket limits ({labels}).", None
+
+def can_add_to_keepers(
+    rec: PlayerRec, current_selection: KeeperSelection, rules: KeeperRules = DEFAULT_RULES
+) -> Tuple[bool, str, Optional[str]]:
     """
     Check if a player can be added to the keeper selection based on current limits.
     Returns (can_add, message, bucket)
     """
     # First check basic eligibility
-    elig, msg, bucket = keeper_verdict(rec)
+    elig, msg, bucket = keeper_verdict(rec, rules)
     if not elig:
         return False, msg, None
     
@@ -86,32 +168,97 @@ def can_add_to_keepers(rec: PlayerRec, current_selection: KeeperSelection) -> Tu
             return False, "Player already selected as keeper.", None
     
     # Check bucket limits
-    bucket_counts = {"1-10": 0, "11-18": 0, "waiver": 0}
+    limits = rules.limits()
+    bucket_counts = {label: 0 for label in limits}
     for keeper in current_selection.keepers:
-        bucket_counts[keeper["bucket"]] += 1
+        if keeper.get("bucket") in bucket_counts:
+            bucket_counts[keeper["bucket"]] += 1
     
-    if bucket == "1-10" and bucket_counts["1-10"] >= 1:
-        return False, "Already have 1 keeper from rounds 1-10.", None
-    elif bucket == "11-18" and bucket_counts["11-18"] >= 1:
-        return False, "Already have 1 keeper from rounds 11-18.", None
-    elif bucket == "waiver" and bucket_counts["waiver"] >= 1:
-        return False, "Already have 1 waiver wire keeper.", None
+    if bucket in limits and bucket_counts[bucket] >= limits[bucket]:
+        n = limits[bucket]
+        if bucket == "waiver":
+            return False, f"Already have {n} waiver wire keeper{'s' if n != 1 else ''}.", None
+        return False, f"Already have {n} keeper{'s' if n != 1 else ''} from rounds {bucket}.", None
     
     # Check total limit
-    if len(current_selection.keepers) >= 3:
-        return False, "Maximum 3 keepers allowed.", None
+    if len(current_selection.keepers) >= rules.max_keepers:
+        return False, f"Maximum {rules.max_keepers} keepers allowed.", None
     
     return True, f"Can add as {bucket} keeper.", bucket
 
-def calculate_keeper_cost(rec: PlayerRec, current_selection: KeeperSelection) -> int:
+def calculate_keeper_cost(
+    rec: PlayerRec, current_selection: KeeperSelection, rules: KeeperRules = DEFAULT_RULES
+) -> int:
     """
     Calculate the draft round cost for a keeper.
     """
     if rec.originally_undrafted:
-        # Check if any other keeper uses round 9
+        # Check if any other keeper uses the waiver round (9th by default)
         for keeper in current_selection.keepers:
-            if keeper["cost_round"] == 9:
-                return 10  # Waiver keeper becomes 10th if 9th is used
-        return 9  # Default waiver keeper cost
+            if keeper["cost_round"] == rules.waiver_cost:
+                return rules.waiver_bumped_cost  # Waiver keeper becomes 10th if 9th is used
+        return rules.waiver_cost  # Default waiver keeper cost
     else:
-        return rec.draft_round or 16  # Use original draft round
+        return rec.draft_round or rules.unknown_round_cost  # Use original draft round
+
+def best_keeper_sets(
+    recs: Iterable[PlayerRec],
+    values: Optional[Dict[int, float]] = None,
+    top_n: int = 3,
+    rules: KeeperRules = DEFAULT_RULES,
+) -> List[KeeperSet]:
+    """
+    Highest-value legal keeper sets for one team's final roster: with the
+    default rules at most one keeper per bucket (1-10, 11-18, waiver), so at
+    most 3 in total, with the waiver keeper costing a 10th when another keeper
+    in the set costs a 9th.
+    A player's value comes from values[player_id], else their ESPN season
+    points. Ties prefer sets whose keepers cost later rounds.
+    """
+    values = values or {}
+
+    def value_of(rec: PlayerRec) -> float:
+        v = values.get(rec.player_id)
+        return float(v if v is not None else (rec.points or 0))
+
+    limits = rules.limits()
+    by_bucket: Dict[str, List[PlayerRec]] = {label: [] for label in limits}
+    for rec in recs:
+        elig, _, bucket = keeper_verdict(rec, rules)
+        if elig and bucket in by_bucket:
+            by_bucket[bucket].append(rec)
+
+    # only a bucket's best top_n + limit - 1 players can appear in the top_n
+    # sets, so each bucket contributes every way of picking up to its limit
+    # from those
+    options = []
+    for bucket, group in by_bucket.items():
+        depth = top_n + limits[bucket] - 1
+        top = [(rec, bucket) for rec in heapq.nlargest(depth, group, key=value_of)]
+        options.append(
+            [pick for k in range(limits[bucket] + 1) for pick in itertools.combinations(top, k)]
+        )
+
+    sets: List[KeeperSet] = []
+    for combo in itertools.product(*options):
+        chosen = [c for picks in combo for c in picks]
+        if not chosen or len(chosen) > rules.max_keepers:
+            continue
+        keepers: List[Dict] = []
+        # drafted keepers first so the waiver keeper's cost sees their rounds
+        for rec, bucket in sorted(chosen, key=lambda c: c[0].originally_undrafted):
+            cost = calculate_keeper_cost(rec, KeeperSelection(team_key="", keepers=keepers), rules)
+            keepers.append(
+                {
+                    "player_id": rec.player_id,
+                    "name": rec.name,
+                    "bucket": bucket,
+                    "draft_round": rec.draft_round,
+                    "cost_round": cost,
+                    "value": value_of(rec),
+                }
+            )
+        sets.append(KeeperSet(value=sum(k["value"] for k in keepers), keepers=keepers))
+
+    sets.sort(key=lambda s: (-s.value, -sum(s.cost_rounds)))
+    return sets[:top_n]
@@ -1,36 +1,111 @@
 # app/routes.py
 from __future__ import annotations
-from flask import Blueprint, current_app, jsonify, render_template, request
-from rapidfuzz import process, fuzz
+import time
+from flask import Blueprint, Response, current_app, g, jsonify, render_template, request
 from .services.espn import (
-    player_index_by_name,
+    player_index,
     dropdown_teams,
-    fetch_league_blob,
-)  # <-- added fetch_league_blob
-from .keeper import check_final_roster, keeper_verdict, TEAMS, can_add_to_keepers, calculate_keeper_cost, KeeperSelection
-import email
-from email import parser
+)
+from .services.eligibility import league_eligibility
+from .config.leagues import tenant_config
+from .keeper import check_final_roster, keeper_verdict, can_add_to_keepers, calculate_keeper_cost, KeeperSelection, best_keeper_sets
+from .http_cache import compress, conditional
+from .services import deadline, events, metrics
 
 bp = Blueprint("main", __name__)
+bp.after_request(compress)
+
+# Cache-Control per kind of response. Snapshot-backed JSON may be reused for a
+# minute (and served stale while revalidating); the page always revalidates.
+SNAPSHOT_CACHE = "public, max-age=60, stale-while-revalidate=300"
+RULES_CACHE = "public, max-age=3600"
+PAGE_CACHE = "no-cache"
+
+
+@bp.before_request
+def start_timing():
+    g.started = time.perf_counter()
+    g.spans = metrics.start_request()
+
+
+@bp.before_request
+def resolve_tenant():
+    """League/season for this request from ?league=&season= (default: LEAGUE_ID, LAST_SEASON)."""
+    try:
+        g.cfg = tenant_config(
+            current_app.config, request.args.get("league"), request.args.get("season")
+        )
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@bp.before_request
+def start_deadline():
+    """Bound the ESPN work one request may wait on (ESPN_REQUEST_BUDGET seconds)."""
+    seconds = current_app.config.get("ESPN_REQUEST_BUDGET")
+    if seconds:
+        g.deadline = deadline.start(seconds)
+
+
+@bp.after_request
+def finish_timing(resp):
+    """Request histogram plus a Server-Timing header (espn, parse, index, search, rules...)."""
+    total = time.perf_counter() - g.started
+    metrics.observe(
+        "http_request_seconds",
+        total,
+        endpoint=request.endpoint or "unknown",
+        method=request.method,
+        status=resp.status_code,
+    )
+    resp.headers["Server-Timing"] = metrics.server_timing(total)
+    return resp
+
+
+@bp.teardown_request
+def end_deadline(exc=None):
+    token = g.pop("deadline", None)
+    if token is not None:
+        deadline.end(token)
+    token = g.pop("spans", None)
+    if token is not None:
+        metrics.end_request(token)
 
 
 @bp.get("/")
 def index():
-    # Build dropdown from ESPN live names; fallback to static if ESPN hiccups
-    try:
-        teams = dropdown_teams(current_app.config)
-        if not teams:
-            teams = TEAMS
-    except Exception:
-        teams = TEAMS
-    return render_template(
-        "index.html", 
-        teams=teams, 
-        last_season=current_app.config["LAST_SEASON"],
-        commissioner_email=current_app.config.get("COMMISSIONER_EMAIL", "")
+    # ESPN team names if they're already cached, else the static list; never
+    # wait on ESPN here. With neither (a new league), the page calls /api/teams.
+    teams = dropdown_teams(g.cfg, wait=False) or g.cfg["TEAMS"]
+    return conditional(
+        lambda: Response(
+            render_template(
+                "index.html",
+                teams=teams,
+                last_season=g.cfg["LAST_SEASON"],
+                commissioner_email=current_app.config.get("COMMISSIONER_EMAIL", ""),
+                live_updates=events.live_updates(request.environ, g.cfg),
+            ),
+            mimetype="text/html",
+        ),
+        PAGE_CACHE,
     )
 
 
+@bp.get("/api/teams")
+def api_teams():
+    """Dropdown teams [{id, name}] from ESPN, falling back to the static list."""
+    try:
+        teams = dropdown_teams(g.cfg) or g.cfg["TEAMS"]
+    except Exception as e:
+        if not g.cfg["TEAMS"]:
+            return jsonify({"error": f"Failed to load ESPN data: {e}"}), 503
+        teams = g.cfg["TEAMS"]
+    return conditional(lambda: jsonify({"teams": teams}), SNAPSHOT_CACHE)
+
+
 @bp.get("/api/team_roster")
 def api_team_roster():
     """
@@ -42,52 +117,31 @@ def api_team_roster():
         return jsonify({"error": "Missing ?team=<team_key>"}), 400
 
     try:
-        blob = fetch_league_blob(current_app.config)
+        idx = player_index(g.cfg)
     except Exception as e:
         return jsonify({"error": f"Failed to fetch ESPN data: {e}"}), 500
 
-    # Build draft round lookup
-    picks = (blob.get("draft", {}) or {}).get("draftDetail", {}).get("picks", []) or []
-    draft_round_by_player = {}
-    for p in picks:
-        pid, rnd = p.get("playerId"), p.get("roundId")  # Use roundId instead of round
-        if isinstance(pid, int) and isinstance(rnd, int):
-            draft_round_by_player[pid] = rnd
-
-    # Map ESPN team id -> our internal key
-    from .config.team_map import TEAM_ID_MAP
-
-    final_sp = blob.get("final_scoring_period")
-    out = []
-    for t in (blob.get("roster") or {}).get("teams", []) or []:
-        espn_tid = t.get("id")
-        mapped = TEAM_ID_MAP.get(espn_tid)
-        if mapped != team_key:
-            continue
-        for e in (t.get("roster") or {}).get("entries", []) or []:
-            p = (e.get("playerPoolEntry") or {}).get("player") or {}
-            pid, full = p.get("id"), p.get("fullName")
-            if not isinstance(pid, int) or not full:
-                continue
-            rd = draft_round_by_player.get(pid)
-            out.append(
-                {
-                    "id": pid,
-                    "name": full,
-                    "draft_round": rd,
-                    "undrafted": rd is None,
-                }
-            )
+    def build():
+        out = [
+            {
+                "id": rec.player_id,
+                "name": rec.name,
+                "draft_round": rec.draft_round,
+                "undrafted": rec.draft_round is None,
+            }
+            for rec in idx.team(team_key)
+        ]
+        return jsonify(
+            {
+                "team_key": team_key,
+                "final_scoring_period": idx.final_scoring_period,
+                "players": sorted(
+                    out, key=lambda x: (x["undrafted"], x["draft_round"] or 99, x["name"])
+                ),
+            }
+        )
 
-    return jsonify(
-        {
-            "team_key": team_key,
-            "final_scoring_period": final_sp,
-            "players": sorted(
-                out, key=lambda x: (x["undrafted"], x["draft_round"] or 99, x["name"])
-            ),
-        }
-    )
+    return conditional(build, SNAPSHOT_CACHE, idx.version)
 
 
 @bp.post("/api/check")
@@ -100,19 +154,18 @@ def api_check():
         return jsonify({"error": "Missing player name or team selection."}), 400
 
     try:
-        idx = player_index_by_name(current_app.config)
+        idx = player_index(g.cfg)
     except Exception as e:
         return jsonify({"error": f"Failed to load ESPN data: {e}"}), 500
 
     rec = idx.get(name)
     if not rec:
-        choices = list(idx.keys())
-        suggestions = process.extract(name, choices, scorer=fuzz.WRatio, limit=3)
-        hint = ", ".join([c[0] for c in suggestions if c[1] >= 75]) or "no close match"
+        suggestions = idx.search.search(name, limit=3, min_score=75)
+        hint = ", ".join(r.name for r, _ in suggestions) or "no close match"
         return jsonify(
             {
                 "final_on_roster": False,
-                "final_message": f"Player not found on any final roster for {current_app.config['LAST_SEASON']}. Suggestions: {hint}.",
+                "final_message": f"Player not found on any final roster for {g.cfg['LAST_SEASON']}. Suggestions: {hint}.",
                 "keeper_eligible": False,
                 "keeper_message": "No eligibility check performed because player was not found.",
                 "keeper_bucket": None,
@@ -133,7 +186,8 @@ def api_check():
             }
         )
 
-    elig, msg, bucket = keeper_verdict(rec)
+    with metrics.timed("rules_seconds", "rules", op="check"):
+        elig, msg, bucket = keeper_verdict(rec, g.cfg["KEEPER_RULES"])
     return jsonify(
         {
             "final_on_roster": True,
@@ -147,6 +201,43 @@ def api_check():
     )
 
 
+@bp.get("/api/players/search")
+def api_players_search():
+    """
+    Typeahead lookup over last season's final rosters.
+    Query: ?q=<partial name>[&limit=N][&team=<team_key>]
+    """
+    q = (request.args.get("q") or "").strip()
+    team_key = (request.args.get("team") or "").strip()
+    limit = min(max(request.args.get("limit", 8, type=int) or 8, 1), 25)
+    if not q:
+        return jsonify({"query": q, "results": []})
+
+    try:
+        idx = player_index(g.cfg)
+    except Exception as e:
+        return jsonify({"error": f"Failed to load ESPN data: {e}"}), 500
+
+    def build():
+        # over-fetch when filtering by team so the filter doesn't starve the list
+        hits = idx.search.search(q, limit=limit * 4 if team_key else limit, min_score=50)
+        results = [
+            {
+                "id": rec.player_id,
+                "name": rec.name,
+                "team_key": rec.final_team_id,
+                "draft_round": rec.draft_round,
+                "undrafted": rec.originally_undrafted,
+                "score": round(score, 1),
+            }
+            for rec, score in hits
+            if not team_key or rec.final_team_id == team_key
+        ]
+        return jsonify({"query": q, "results": results[:limit]})
+
+    return conditional(build, SNAPSHOT_CACHE, idx.version)
+
+
 @bp.post("/api/check_keeper_selection")
 def api_check_keeper_selection():
     """
@@ -161,7 +252,7 @@ def api_check_keeper_selection():
         return jsonify({"error": "Missing player name or team selection."}), 400
 
     try:
-        idx = player_index_by_name(current_app.config)
+        idx = player_index(g.cfg)
     except Exception as e:
         return jsonify({"error": f"Failed to load ESPN data: {e}"}), 500
 
@@ -173,10 +264,12 @@ def api_check_keeper_selection():
     selection = KeeperSelection(team_key=team_key, keepers=current_keepers)
     
     # Check if can be added
-    can_add, message, bucket = can_add_to_keepers(rec, selection)
-    
+    with metrics.timed("rules_seconds", "rules", op="selection"):
+        can_add, message, bucket = can_add_to_keepers(rec, selection, g.cfg["KEEPER_RULES"])
+        if can_add:
+            cost_round = calculate_keeper_cost(rec, selection, g.cfg["KEEPER_RULES"])
+
     if can_add:
-        cost_round = calculate_keeper_cost(rec, selection)
         return jsonify({
             "can_add": True,
             "message": message,
@@ -197,23 +290,207 @@ def api_check_keeper_selection():
         })
 
 
+MAX_BATCH_PLAYERS = 100
+
+
+@bp.post("/api/check_batch")
+def api_check_batch():
+    """
+    Evaluate many players for one team against a single index snapshot.
+    Body: { team_id, players: [name | player_id, ...], current_keepers: [...] }
+    Response: { team_key, results: [...] } in the same order as players.
+    """
+    data = request.get_json(force=True) or {}
+    team_key = (data.get("team_id") or "").strip()
+    players = data.get("players") or []
+    current_keepers = data.get("current_keepers", [])
+
+    if not team_key or not isinstance(players, list) or not players:
+        return jsonify({"error": "Missing team selection or players list."}), 400
+    if len(players) > MAX_BATCH_PLAYERS:
+        return jsonify({"error": f"At most {MAX_BATCH_PLAYERS} players per batch."}), 400
+
+    try:
+        idx = player_index(g.cfg)
+    except Exception as e:
+        return jsonify({"error": f"Failed to load ESPN data: {e}"}), 500
+
+    selection = KeeperSelection(team_key=team_key, keepers=current_keepers)
+    rules = g.cfg["KEEPER_RULES"]
+    results = []
+    with metrics.timed("rules_seconds", "rules", op="batch"):
+        for q in players:
+            if isinstance(q, int):
+                rec = idx.get_by_id(q)
+            else:
+                rec = idx.get(str(q))
+            if not rec:
+                results.append({"query": q, "found": False})
+                continue
+
+            final_ok, final_msg = check_final_roster(rec, team_key)
+            if final_ok:
+                elig, keeper_msg, bucket = keeper_verdict(rec, rules)
+                can_add, add_msg, _ = can_add_to_keepers(rec, selection, rules)
+            else:
+                elig, bucket, can_add = False, None, False
+                keeper_msg = add_msg = "Ineligible because the player was not on your final roster last season."
+            results.append(
+                {
+                    "query": q,
+                    "found": True,
+                    "player_info": {
+                        "id": rec.player_id,
+                        "name": rec.name,
+                        "draft_round": rec.draft_round,
+                        "undrafted": rec.originally_undrafted,
+                    },
+                    "final_on_roster": final_ok,
+                    "final_message": final_msg,
+                    "keeper_eligible": bool(elig),
+                    "keeper_message": keeper_msg,
+                    "keeper_bucket": bucket,
+                    "can_add": can_add,
+                    "message": add_msg,
+                    "cost_round": calculate_keeper_cost(rec, selection, rules) if can_add else None,
+                }
+            )
+
+    return jsonify({"team_key": team_key, "results": results})
+
+
+def _league_table(idx):
+    try:
+        teams = g.cfg["TEAMS"] or dropdown_teams(g.cfg)
+    except Exception:
+        teams = []
+    return league_eligibility(g.cfg, idx, teams)
+
+
+@bp.get("/api/league_keepers")
+def api_league_keepers():
+    """
+    Every team's final roster with keeper bucket, cost round and eligibility.
+    Query: ?format=csv for a spreadsheet download (default JSON).
+    """
+    try:
+        idx = player_index(g.cfg)
+    except Exception as e:
+        return jsonify({"error": f"Failed to load ESPN data: {e}"}), 500
+
+    table = _league_table(idx)
+    if (request.args.get("format") or "").lower() == "csv":
+        season = g.cfg["LAST_SEASON"]
+        return conditional(
+            lambda: Response(
+                table.csv,
+                mimetype="text/csv",
+                headers={
+                    "Content-Disposition": f"attachment; filename=league_keepers_{season}.csv"
+                },
+            ),
+            SNAPSHOT_CACHE,
+            table.version,
+        )
+    return conditional(
+        lambda: jsonify(
+            {
+                "league": g.cfg["LEAGUE_ID"],
+                "season": g.cfg["LAST_SEASON"],
+                "version": table.version,
+                "teams": [
+                    {"team_key": key, "team_name": table.team_names.get(key, key), "players": list(rows)}
+                    for key, rows in table.teams.items()
+                ],
+            }
+        ),
+        SNAPSHOT_CACHE,
+        table.version,
+    )
+
+
+@bp.post("/api/optimal_keepers")
+def api_optimal_keepers():
+    """
+    Best legal keeper sets per team.
+    Body: { team_id?: <team_key> (omit for every team), values?: {player_id: score}, top_n?: N }
+    Without values, players are scored by their ESPN season fantasy points.
+    """
+    data = request.get_json(silent=True) or {}
+    team_key = (data.get("team_id") or "").strip()
+    top_n = data.get("top_n", 3)
+    if not isinstance(top_n, int) or not 1 <= top_n <= 10:
+        return jsonify({"error": "top_n must be an integer from 1 to 10."}), 400
+    try:
+        values = {int(pid): float(v) for pid, v in (data.get("values") or {}).items()}
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({"error": "values must map player ids to numbers."}), 400
+
+    try:
+        idx = player_index(g.cfg)
+    except Exception as e:
+        return jsonify({"error": f"Failed to load ESPN data: {e}"}), 500
+
+    keys = [team_key] if team_key else list(_league_table(idx).teams)
+    with metrics.timed("rules_seconds", "rules", op="optimal"):
+        teams = [
+            {
+                "team_key": key,
+                "sets": [
+                    {"value": ks.value, "keepers": ks.keepers}
+                    for ks in best_keeper_sets(idx.team(key), values, top_n, g.cfg["KEEPER_RULES"])
+                ],
+            }
+            for key in keys
+        ]
+    return jsonify({"teams": teams})
+
+
 @bp.get("/api/keeper_limits")
 def api_keeper_limits():
     """
     Get current keeper selection limits and rules.
     """
-    return jsonify({
-        "max_keepers": 3,
-        "limits": {
-            "1-10": 1,
-            "11-18": 1,
-            "waiver": 1
-        },
-        "rules": [
-            "Maximum 3 keepers total",
-            "1 keeper from rounds 1-10",
-            "1 keeper from rounds 11-18", 
-            "1 waiver wire keeper (undrafted players)",
-            "Players kept last year cannot be kept again"
-        ]
-    })
+    rules = g.cfg["KEEPER_RULES"]
+    return conditional(
+        lambda: jsonify({
+            "max_keepers": rules.max_keepers,
+            "limits": rules.limits(),
+            "rules": rules.describe(),
+        }),
+        RULES_CACHE,
+    )
+
+
+@bp.get("/api/events")
+def api_events():
+    """
+    Server-sent events for the league: a "team" event with one team's added,
+    removed (ids) and changed players (rows as in /api/league_keepers)
+    whenever the snapshot changes, then a "version" event; "reload" when a
+    reconnecting client missed changes. Each stream holds a thread, so they are
+    capped per worker (EVENTS_MAX_STREAMS, off by default) and end after
+    EVENTS_MAX_STREAM_SECONDS; EventSource reconnects on its own.
+    """
+    if events.open_streams() >= g.cfg.get("EVENTS_MAX_STREAMS", 0):
+        return jsonify({"error": "Too many live connections; refresh to update."}), 503
+    feed = events.league_feed(g.cfg)
+    try:
+        feed.prime()
+    except Exception as e:
+        return jsonify({"error": f"Failed to load ESPN data: {e}"}), 503
+    return Response(
+        events.stream(
+            feed,
+            request.headers.get("Last-Event-ID"),
+            g.cfg.get("EVENTS_MAX_STREAM_SECONDS", 300),
+        ),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.get("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target: counters and timings of the worker that answers."""
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
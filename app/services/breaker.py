@@ -0,0 +1,84 @@
+# app/services/breaker.py
+from __future__ import annotations
+import os
+import threading
+import time
+import requests
+from . import metrics
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """ESPN is considered down; the call was refused without touching the network."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker around an upstream.
+
+    closed    -> calls go through; `failures` failures in a row open it
+    open      -> calls fail fast with CircuitOpenError for `reset_after` seconds
+    half-open -> one probe call is let through; success closes, failure re-opens
+
+    Subclassing requests.ConnectionError means every existing
+    `except requests.RequestException` fallback handles a refused call.
+    """
+
+    def __init__(self, failures: int = 3, reset_after: float = 30):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failed = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_after:
+            return "open"
+        return "half-open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go out now."""
+        if self._opened_at is None:
+            return
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                metrics.inc("espn_breaker_transitions_total", state="half-open")
+                return
+        metrics.inc("espn_breaker_rejected_total")
+        raise CircuitOpenError(f"ESPN circuit {state}; not calling upstream")
+
+    def record_success(self) -> None:
+        if self._opened_at is None and not self._failed:
+            return
+        with self._lock:
+            if self._opened_at is not None:
+                metrics.inc("espn_breaker_transitions_total", state="closed")
+            self._failed = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self) -> None:
+        """The allowed call never reached ESPN; let another caller probe."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failed += 1
+            if self._probing or self._failed >= self.failures:
+                if self._opened_at is None or self._probing:
+                    metrics.inc("espn_breaker_transitions_total", state="open")
+                self._opened_at = time.monotonic()
+            self._probing = False
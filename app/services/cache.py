@@ -0,0 +1,262 @@
+# app/services/cache.py
+from __future__ import annotations
+import itertools
+import os
+from collections import OrderedDict
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+from . import deadline, metrics
+
+# Every successful load gets a new, globally increasing version number, so the
+# max version over a set of entries changes whenever any one of them refreshes.
+_versions = itertools.count(1)
+
+# Loaders may return this instead of a value when upstream reports no change
+# (HTTP 304 or identical content): the cached value and its version are kept
+# and only its age is reset.
+UNCHANGED = object()
+
+
+class Validated(NamedTuple):
+    """A loaded value plus the upstream validators of the response it came from."""
+
+    value: Any
+    validators: Tuple
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fetched_at: float
+    version: int
+    # (ETag, Last-Modified, content digest) of the response value was parsed
+    # from, when the loader returned Validated; the next load sends them back
+    validators: Optional[Tuple] = None
+
+
+class _Flight:
+    """One in-progress upstream load that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry: Optional[CacheEntry] = None
+        self.error: Optional[BaseException] = None
+
+
+class SnapshotCache:
+    """
+    TTL cache for ESPN payloads.
+
+    - fresh entries (age < ttl) are returned as-is,
+    - stale entries (age < ttl + stale_ttl) are returned immediately while a
+      background thread refreshes them,
+    - missing/expired entries are loaded synchronously, and concurrent callers
+      for the same key wait on a single upstream load (single-flight).
+    """
+
+    def __init__(self, ttl: float = 300, stale_ttl: float = 3600):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, CacheEntry] = {}
+        self._inflight: Dict[Hashable, _Flight] = {}
+        _live_caches.add(self)
+
+    def _after_fork_in_child(self) -> None:
+        # A load running in another thread when gunicorn forked (e.g. the boot
+        # warm-up) doesn't exist in the child: drop its flight so requests load
+        # again instead of waiting forever, and replace a possibly-held lock.
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def get(
+        self, key: Hashable, loader: Callable[[], Any], ttl: float | None = None
+    ) -> CacheEntry:
+        """ttl overrides the cache default for this key (math.inf = never refresh)."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry.fetched_at
+                if age < ttl:
+                    metrics.inc("snapshot_cache_requests_total", result="fresh")
+                    return entry
+                if age < ttl + self.stale_ttl:
+                    metrics.inc("snapshot_cache_requests_total", result="stale")
+                    self._refresh_in_background(key, loader)
+                    return entry
+            metrics.inc("snapshot_cache_requests_total", result="miss")
+            flight, leader = self._join(key)
+        return self._wait(key, loader, flight, leader)
+
+    def refresh(self, key: Hashable, loader: Callable[[], Any]) -> CacheEntry:
+        """Load key now whatever its age, joining a load already in flight."""
+        with self._lock:
+            flight, leader = self._join(key)
+        return self._wait(key, loader, flight, leader)
+
+    def _join(self, key: Hashable) -> Tuple[_Flight, bool]:
+        # caller holds self._lock; returns (flight, whether we must run it)
+        flight = self._inflight.get(key)
+        if flight is not None:
+            return flight, False
+        flight = self._inflight[key] = _Flight()
+        return flight, True
+
+    def _wait(
+        self, key: Hashable, loader: Callable[[], Any], flight: _Flight, leader: bool
+    ) -> CacheEntry:
+        if leader:
+            self._load(key, loader, flight)
+        elif not flight.done.wait(deadline.check("cache wait")):
+            # the load carries on for later callers; this one is out of time
+            raise deadline.DeadlineExceeded(f"still loading {key!r}")
+        if flight.error is not None:
+            raise flight.error
+        return flight.entry
+
+    def lookup(self, key: Hashable) -> Optional[CacheEntry]:
+        """The entry get() would answer with right away (fresh or stale), else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.fetched_at >= self.ttl + self.stale_ttl:
+            return None
+        return entry
+
+    def put(self, key: Hashable, value: Any) -> CacheEntry:
+        """
+        Store a value loaded elsewhere (e.g. by the async client); UNCHANGED
+        keeps the old one, Validated also records its validators.
+        """
+        validators = None
+        if isinstance(value, Validated):
+            value, validators = value
+        with self._lock:
+            if value is UNCHANGED:
+                old = self._entries.get(key)
+                if old is None:
+                    raise LookupError(f"{key!r} reported unchanged but is not cached")
+                entry = CacheEntry(old.value, time.monotonic(), old.version, old.validators)
+            else:
+                entry = CacheEntry(value, time.monotonic(), next(_versions), validators)
+            self._entries[key] = entry
+            return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return whatever is cached for key (fresh or not) without loading."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Any]) -> None:
+        # caller holds self._lock
+        if key in self._inflight:
+            return
+        flight = self._inflight[key] = _Flight()
+        threading.Thread(
+            target=self._load, args=(key, loader, flight), daemon=True
+        ).start()
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], flight: _Flight) -> None:
+        try:
+            flight.entry = self.put(key, loader())
+        except BaseException as e:  # surfaced to waiting callers
+            flight.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+
+# Every SnapshotCache, for the one fork hook below. Weak, because hooks can't
+# be unregistered: a hook per cache would keep evicted caches (and all their
+# ESPN payloads) alive for the life of the process.
+_live_caches: "weakref.WeakSet[SnapshotCache]" = weakref.WeakSet()
+
+
+def _caches_after_fork_in_child() -> None:
+    for cache in list(_live_caches):
+        cache._after_fork_in_child()
+
+
+os.register_at_fork(after_in_child=_caches_after_fork_in_child)
+
+
+class LRU:
+    """
+    Small thread-safe LRU map. Bounds per-tenant state (snapshot caches,
+    player indexes) so serving many leagues can't grow memory without limit.
+    on_evict(value), if given, is called (outside the lock) for every value
+    pushed out by a newer key or replaced by get_or_create, so values holding
+    threads or file descriptors can release them.
+
+    Values may carry a tag (the tenant config fingerprint): get() treats a
+    value stored under another tag as missing and get_or_create() replaces it.
+    """
+
+    def __init__(self, maxsize: int = 32, on_evict: Callable[[Any], None] | None = None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._tags: Dict[Hashable, Hashable] = {}
+        os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable, tag: Hashable = None) -> Any:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None or self._tags.get(key) != tag:
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def peek(self, key: Hashable) -> Any:
+        """get() without counting as a use."""
+        return self._items.get(key)
+
+    def _trim(self) -> List[Any]:
+        evicted = []
+        while len(self._items) > self.maxsize:
+            key, value = self._items.popitem(last=False)
+            self._tags.pop(key, None)
+            evicted.append(value)
+        return evicted
+
+    def _evicted(self, values: List[Any]) -> None:
+        if self.on_evict is not None:
+            for value in values:
+                self.on_evict(value)
+
+    def put(self, key: Hashable, value: Any, tag: Hashable = None) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            self._tags[key] = tag
+            evicted = self._trim()
+        self._evicted(evicted)
+
+    def get_or_create(
+        self, key: Hashable, factory: Callable[[], Any], tag: Hashable = None
+    ) -> Any:
+        evicted: List[Any] = []
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None and self._tags.get(key) != tag:
+                evicted.append(self._items.pop(key))
+                value = None
+            if value is None:
+                value = self._items[key] = factory()
+                self._tags[key] = tag
+                evicted += self._trim()
+            else:
+                self._items.move_to_end(key)
+        self._evicted(evicted)
+        return value
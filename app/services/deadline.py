@@ -0,0 +1,66 @@
+# app/services/deadline.py
+from __future__ import annotations
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import requests
+from . import metrics
+
+# monotonic time by which the current request (or warm-up) must be done
+_expires: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "espn_deadline", default=None
+)
+
+
+class DeadlineExceeded(requests.Timeout):
+    """The caller's time budget ran out before ESPN could be asked (again)."""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None when there is no budget."""
+    expires = _expires.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def check(where: str) -> Optional[float]:
+    """remaining(), raising DeadlineExceeded when the budget is used up."""
+    left = remaining()
+    if left is not None and left <= 0:
+        metrics.inc("espn_deadline_exceeded_total", where=where)
+        raise DeadlineExceeded(f"time budget exhausted before {where}")
+    return left
+
+
+def start(seconds: float) -> contextvars.Token:
+    """Begin a budget of seconds (never extending an enclosing one); pass the token to end()."""
+    expires = time.monotonic() + seconds
+    outer = _expires.get()
+    return _expires.set(expires if outer is None else min(outer, expires))
+
+
+def end(token: contextvars.Token) -> None:
+    _expires.reset(token)
+
+
+@contextmanager
+def budget(seconds: Optional[float]) -> Iterator[None]:
+    if seconds is None:
+        yield
+        return
+    token = start(seconds)
+    try:
+        yield
+    finally:
+        end(token)
+
+
+@contextmanager
+def share(parts: int) -> Iterator[None]:
+    """
+    Give the block 1/parts of what's left, so earlier of several sequential
+    steps can't starve the later ones. No-op without a budget.
+    """
+    left = remaining()
+    with budget(max(left, 0) / parts if left is not None else None):
+        yield
@@ -0,0 +1,93 @@
+# app/services/eligibility.py
+from __future__ import annotations
+import csv
+import io
+import threading
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
+from ..config.leagues import tenant_fingerprint
+from ..keeper import DEFAULT_RULES, KeeperRules, KeeperSelection, calculate_keeper_cost, keeper_verdict
+from . import metrics
+from .cache import LRU
+from .player_index import PlayerIndex
+
+CSV_FIELDS = [
+    "team_key", "team_name", "player_id", "name", "draft_round", "undrafted",
+    "eligible", "bucket", "cost_round", "reason",
+]
+
+
+class LeagueEligibility:
+    """
+    Every team's final-roster players with their keeper bucket, standalone
+    cost round and eligibility reason, precomputed for one snapshot version.
+    Read-only once built; the CSV export is rendered once alongside.
+    """
+
+    __slots__ = ("version", "teams", "team_names", "csv")
+
+    def __init__(self, version: int, teams: Dict[str, List[Dict]], team_names: Dict[str, str]):
+        self.version = version
+        self.team_names: Mapping[str, str] = MappingProxyType(dict(team_names))
+        self.teams: Mapping[str, Tuple[Dict, ...]] = MappingProxyType(
+            {key: tuple(rows) for key, rows in teams.items()}
+        )
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for key, rows in self.teams.items():
+            for row in rows:
+                writer.writerow({"team_key": key, "team_name": team_names.get(key, key), **row})
+        self.csv = buf.getvalue()
+
+
+def build_league_eligibility(
+    idx: PlayerIndex, teams_list: List[Dict], rules: KeeperRules = DEFAULT_RULES
+) -> LeagueEligibility:
+    empty = KeeperSelection(team_key="", keepers=[])
+    names = {t["id"]: t["name"] for t in teams_list}
+    teams: Dict[str, List[Dict]] = {}
+    # league dropdown order first, then any mapped team keys not in the dropdown
+    keys = list(names) + sorted(k for k in idx.by_team if k not in names)
+    for key in keys:
+        rows = []
+        for rec in idx.team(key):
+            elig, reason, bucket = keeper_verdict(rec, rules)
+            rows.append(
+                {
+                    "player_id": rec.player_id,
+                    "name": rec.name,
+                    "draft_round": rec.draft_round,
+                    "undrafted": rec.originally_undrafted,
+                    "eligible": bool(elig),
+                    "bucket": bucket,
+                    "cost_round": calculate_keeper_cost(rec, empty, rules) if elig else None,
+                    "reason": reason,
+                }
+            )
+        rows.sort(key=lambda r: (r["undrafted"], r["draft_round"] or 99, r["name"]))
+        teams[key] = rows
+    return LeagueEligibility(idx.version, teams, names)
+
+
+# (league, season) -> table for that tenant's latest snapshot
+_tables = LRU()
+_lock = threading.Lock()
+
+
+def league_eligibility(cfg, idx: PlayerIndex, teams_list: List[Dict]) -> LeagueEligibility:
+    """Shared table for idx's snapshot; regenerated only when the version changes."""
+    key, tag = (cfg["LEAGUE_ID"], cfg["LAST_SEASON"]), tenant_fingerprint(cfg)
+    table = _tables.get(key, tag)
+    if table is not None and table.version == idx.version:
+        return table
+    with _lock:
+        table = _tables.get(key, tag)
+        if table is None or table.version != idx.version:
+            _tables.maxsize = cfg.get("TENANT_CACHE_SIZE", 32)
+            with metrics.timed("rules_seconds", "rules", op="league_table"):
+                table = build_league_eligibility(
+                    idx, teams_list, cfg.get("KEEPER_RULES", DEFAULT_RULES)
+                )
+            _tables.put(key, table, tag)
+        return table
@@ -1,15 +1,50 @@
 # app/services/espn.py
 from __future__ import annotations
-from typing import Dict, List, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Mapping, Tuple
+import asyncio
+import contextvars
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
 import requests
-from ..keeper import PlayerRec
+from requests.adapters import HTTPAdapter
+from ..keeper import DEFAULT_RULES, PlayerRec
+from ..config.leagues import tenant_fingerprint
 from ..config.team_map import TEAM_ID_MAP, SEASONS_KEPT_OVERRIDES
+from . import deadline, metrics
+from .breaker import CircuitBreaker
+from .cache import LRU, UNCHANGED, SnapshotCache, Validated
+from .history import KeepHistory, kept_player_ids, seasons_kept
+from .player_index import PlayerIndex
+from .refresher import Refresher
+from .shared import SharedSnapshot
+from .store import SnapshotStore
 
 API_HOSTS = [
+    h.strip() for h in os.environ.get("ESPN_API_HOSTS", "").split(",") if h.strip()
+] or [
     "https://lm-api-reads.fantasy.espn.com",  # authenticates reliably
     "https://fantasy.espn.com",  # fallback (may 302)
 ]
 API_PATH = "/apis/v3/games/ffl/seasons/{season}/segments/0/leagues/{league}"
+# part of the remaining budget the first host to try may use (see _attempt_timeout)
+PREFERRED_HOST_SHARE = 0.8
+
+# mRoster entries carry full playerPoolEntry objects (stats, ratings,
+# ownership...) but we only read these keys. Parsing with this whitelist
+# drops everything else as soon as each object is built, so those subtrees
+# never pile up in memory, the cache or the on-disk store.
+ROSTER_KEYS = frozenset(
+    {"teams", "id", "roster", "entries", "playerId", "playerPoolEntry",
+     "player", "fullName", "appliedStatTotal"}
+)
+# per-pick fields kept from mDraftDetail
+DRAFT_PICK_KEYS = ("playerId", "roundId", "teamId", "keeper", "overallPickNumber")
 
 
 def _cookies(cfg) -> Dict[str, str]:
@@ -31,87 +66,898 @@ def _headers(cfg) -> Dict[str, str]:
     }
 
 
-def _get_json(cfg, params: Dict[str, str], season: int):
-    last_err = None
-    for host in API_HOSTS:
-        url = host + API_PATH.format(season=season, league=cfg["LEAGUE_ID"])
-        r = requests.get(
-            url,
-            params=params,
-            cookies=_cookies(cfg),
-            headers=_headers(cfg),
-            timeout=25,
-            allow_redirects=False,
-        )
+def _request_headers(cfg, validators: Tuple | None) -> Dict[str, str]:
+    # validators of the cached copy make the request conditional
+    headers = _headers(cfg)
+    if validators and validators[0]:
+        headers["If-None-Match"] = validators[0]
+    if validators and validators[1]:
+        headers["If-Modified-Since"] = validators[1]
+    return headers
+
+
+class _UpstreamCall:
+    """
+    One get_json across the ESPN hosts, shared by EspnClient and
+    AsyncEspnClient so only the transport differs: host order and per-host
+    timeouts, what each response means, and the circuit-breaker bookkeeping
+    once the call is over.
+    """
+
+    def __init__(self, client: "EspnClient"):
+        self.client = client
+        self.last_err: Exception | None = None
+        self.responded = False  # ESPN answered (even with an error of ours, e.g. 404)
+        self.unhealthy = False  # an attempt failed in a way that speaks against ESPN
+
+    def __enter__(self) -> "_UpstreamCall":
+        self.client.breaker.before_call()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        breaker = self.client.breaker
+        if self.responded:
+            breaker.record_success()
+        elif self.unhealthy:
+            breaker.record_failure()
+        else:  # out of budget before asking ESPN anything, or only for part of a timeout
+            breaker.release()
+
+    def attempts(self, cfg, season: int) -> Iterator[Tuple[str, str, float]]:
+        """(host, url, timeout) for each host to try, in order."""
+        hosts = self.client.hosts()
+        for i, host in enumerate(hosts):
+            timeout = self.client._attempt_timeout(last=i == len(hosts) - 1)
+            yield host, host + API_PATH.format(season=season, league=cfg["LEAGUE_ID"]), timeout
+
+    def failed(self, host: str, e: requests.RequestException, timeout: float) -> None:
+        """The attempt on host, given timeout seconds, got no response (after its retries)."""
+        timed_out = isinstance(e, requests.Timeout)
+        self.client._host_result(host, "timeout" if timed_out else "error")
+        # a timeout the caller's budget cut below ESPN_TIMEOUT says nothing
+        # about ESPN's health: don't let it open the breaker
+        if not (timed_out and timeout < self.client.timeout):
+            self.unhealthy = True
+        self.last_err = e
+
+    def answered(self, host: str, url: str, r, validators: Tuple | None):
+        """
+        Classify host's response: UNCHANGED for a 304 or the cached content,
+        the content digest of a JSON 200 to parse, else None (the error is
+        kept in last_err and the next host is tried).
+        """
         ct = r.headers.get("Content-Type", "")
+        if r.status_code in EspnClient.RETRY_STATUSES:
+            self.unhealthy = True  # still failing after the retries
+        else:
+            self.responded = True
+        if r.status_code == 304 and validators:
+            self.client._host_result(host, "not_modified")
+            return UNCHANGED
         if 300 <= r.status_code < 400:
-            last_err = requests.HTTPError(
+            self.client._host_result(host, "redirect")
+            self.last_err = requests.HTTPError(
                 f"Redirected ({r.status_code}) to {r.headers.get('Location')} @ {url}"
             )
-            continue
+            return None
         if r.status_code == 200 and "application/json" in ct:
-            return r.json()
-        last_err = requests.HTTPError(
+            self.client._host_result(host, "ok")
+            metrics.inc("espn_upstream_bytes_total", len(r.content), host=host)
+            # hashing is far cheaper than parsing, and ESPN rarely sends ETags
+            digest = hashlib.blake2b(r.content, digest_size=16).digest()
+            if validators and validators[2] == digest:
+                return UNCHANGED
+            return digest
+        self.client._host_result(host, f"http_{r.status_code}")
+        self.last_err = requests.HTTPError(
             f"{r.status_code} for {url} (CT={ct}) — {(r.text or '')[:200]!r}"
         )
-    raise last_err
+        return None
 
 
-def _best_final_period(cfg, season: int, hint: int | None) -> int:
-    # probe late-season periods; choose the one with the most total rostered entries
-    candidates: List[Tuple[int, int]] = []
-    for sp in range(22, max(12, (hint or 0)) - 1, -1):  # 22→hint (or 12)
-        try:
-            data = _get_json(
-                cfg, {"view": "mRoster", "scoringPeriodId": str(sp)}, season
+class EspnClient:
+    """
+    Keep-alive HTTP client for the ESPN league endpoint.
+
+    One pooled requests.Session per process (gunicorn --preload forks after
+    import, so the session and thread pool are recreated in each worker),
+    retries with backoff on 429/5xx (within the deadline), a small thread pool for
+    fetching independent views side by side. A circuit breaker shared by every
+    caller fails fast once ESPN has stopped answering, hosts are tried
+    starting with the one that last answered, and per-attempt timeouts are cut
+    down to whatever is left of the caller's deadline budget.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        pool_size: int = 8,
+        retries: int = 2,
+        backoff: float = 0.3,
+        timeout: float = 25,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._pid = None
+        self._lock = threading.Lock()
+        self._session: requests.Session | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._preferred: str | None = None  # host that answered last
+        self._host_failures: Dict[str, int] = {}  # consecutive failures per host
+        os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+        self._pid = None  # rebuild session + pool on first use in this process
+
+    def _ensure(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # no urllib3 retries: _get retries itself, so a retry can never
+            # outlive the caller's deadline budget (urllib3 would re-apply the
+            # full timeout to each one)
+            adapter = HTTPAdapter(
+                pool_connections=len(API_HOSTS),
+                pool_maxsize=self.pool_size,
+                max_retries=0,
             )
-        except Exception:
-            continue
-        total = sum(
-            len((t.get("roster") or {}).get("entries") or [])
-            for t in data.get("teams", [])
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="espn"
+            )
+            self._pid = os.getpid()
+
+    def hosts(self) -> List[str]:
+        """API_HOSTS in try order: last host that answered, then fewest recent failures."""
+        return sorted(
+            API_HOSTS, key=lambda h: (h != self._preferred, self._host_failures.get(h, 0))
+        )
+
+    def _host_result(self, host: str, outcome: str) -> None:
+        metrics.inc("espn_host_requests_total", host=host, outcome=outcome)
+        if outcome in ("ok", "not_modified"):
+            self._host_failures[host] = 0
+            if host != self._preferred:
+                metrics.inc("espn_host_preferred_total", host=host)
+                self._preferred = host
+        else:
+            self._host_failures[host] = self._host_failures.get(host, 0) + 1
+
+    def _attempt_timeout(self, last: bool) -> float:
+        # The host tried first is the one that answered last, so it gets most
+        # of what's left of the budget; later ones are fallbacks (the other
+        # host mostly redirects) and get the rest.
+        left = deadline.check("espn request")
+        if left is None:
+            return self.timeout
+        return max(0.05, min(self.timeout, left if last else left * PREFERRED_HOST_SHARE))
+
+    def _pause(self, attempt: int, r=None) -> float | None:
+        """
+        Seconds to back off before retry number attempt (Retry-After when ESPN
+        sends one), or None when there are no retries left or the pause would
+        run past the deadline.
+        """
+        if attempt > self.retries:
+            return None
+        pause = self.backoff * 2 ** (attempt - 1)
+        after = r.headers.get("Retry-After", "") if r is not None else ""
+        if after.isdigit():
+            pause = float(after)
+        left = deadline.remaining()
+        if left is not None and left <= pause:
+            return None
+        return pause
+
+    def _get(self, url, params, cookies, headers, timeout: float):
+        """
+        GET retried on 429/5xx and connection errors with exponential backoff.
+        All attempts together stay within timeout (this host's share of the
+        budget); timeouts are not retried on the same host.
+        """
+        ends = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                r = self._session.get(
+                    url,
+                    params=params,
+                    cookies=cookies,
+                    headers=headers,
+                    timeout=max(0.05, ends - time.monotonic()),
+                    allow_redirects=False,
+                )
+            except requests.Timeout:
+                raise
+            except requests.ConnectionError:
+                pause = self._pause(attempt)
+                if pause is None or time.monotonic() + pause >= ends:
+                    raise
+                time.sleep(pause)
+                continue
+            if r.status_code not in self.RETRY_STATUSES:
+                return r
+            pause = self._pause(attempt, r)
+            if pause is None or time.monotonic() + pause >= ends:
+                return r
+            time.sleep(pause)
+
+    def get_json(
+        self,
+        cfg,
+        params: Dict[str, str],
+        season: int,
+        keep: frozenset | None = None,
+        validators: Tuple | None = None,
+    ):
+        """
+        GET one league payload; with keep, only those object keys are parsed.
+
+        Loads for the snapshot cache pass validators, those of the cached
+        entry (() when there are none): the payload then comes back as
+        Validated(payload, new validators) for the entry to keep, or as
+        UNCHANGED when ESPN answers 304 to them or sends byte-identical
+        content. Without validators the plain payload is returned.
+        """
+        view = params.get("view")
+        view = "+".join(view) if isinstance(view, (list, tuple)) else str(view)
+        with metrics.timed("espn_request_seconds", "espn", view=view):
+            return self._fetch(cfg, params, season, keep, validators, view)
+
+    def _fetch(self, cfg, params, season, keep, validators, view):
+        self._ensure()
+        with _UpstreamCall(self) as call:
+            for host, url, timeout in call.attempts(cfg, season):
+                try:
+                    r = self._get(
+                        url, params, _cookies(cfg), _request_headers(cfg, validators), timeout
+                    )
+                except requests.RequestException as e:
+                    call.failed(host, e, timeout)
+                    continue
+                digest = call.answered(host, url, r, validators)
+                if digest is None:
+                    continue
+                if digest is UNCHANGED:
+                    return UNCHANGED
+                with metrics.timed("espn_parse_seconds", "parse", view=view):
+                    if keep is None:
+                        data = r.json()
+                    else:
+                        data = json.loads(
+                            r.content,
+                            object_pairs_hook=lambda pairs: {k: v for k, v in pairs if k in keep},
+                        )
+                return _validated(data, r, digest, validators)
+            raise call.last_err
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Run fn in the pool, carrying the caller's deadline budget along."""
+        self._ensure()
+        return self._executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+_client: EspnClient | None = None
+_client_lock = threading.Lock()
+
+
+def espn_client(cfg) -> EspnClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = EspnClient(
+                    pool_size=cfg.get("ESPN_POOL_SIZE", 8),
+                    retries=cfg.get("ESPN_MAX_RETRIES", 2),
+                    timeout=cfg.get("ESPN_TIMEOUT", 25),
+                    breaker=CircuitBreaker(
+                        failures=cfg.get("ESPN_BREAKER_FAILURES", 3),
+                        reset_after=cfg.get("ESPN_BREAKER_RESET", 30),
+                    ),
+                )
+    return _client
+
+
+class AsyncEspnClient:
+    """
+    asyncio counterpart of EspnClient for the ASGI entry point (asgi.py), so a
+    request waiting on ESPN costs a coroutine instead of a thread. Host order
+    and health, per-attempt timeouts and the circuit breaker are the process's
+    EspnClient's, so both clients share one picture of ESPN. Needs httpx,
+    which is only imported here, on first use.
+    """
+
+    def __init__(self, sync: EspnClient):
+        self.sync = sync
+        self._client = None  # httpx.AsyncClient, bound to the running loop
+
+    def _ensure(self):
+        if self._client is None:
+            import httpx  # optional: pip install httpx
+
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.sync.pool_size * 4),
+                follow_redirects=False,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_json(
+        self,
+        cfg,
+        params: Dict[str, str],
+        season: int,
+        keep: frozenset | None = None,
+        validators: Tuple | None = None,
+    ):
+        """Same contract as EspnClient.get_json; requests exceptions on failure."""
+        view = params.get("view")
+        view = "+".join(view) if isinstance(view, (list, tuple)) else str(view)
+        with metrics.timed("espn_request_seconds", "espn", view=view):
+            return await self._fetch(cfg, params, season, keep, validators, view)
+
+    async def _get(self, url, params, headers, timeout):
+        # httpx only retries connects; retry 429/5xx like EspnClient._get, all
+        # attempts within timeout (this host's share of the budget)
+        import httpx
+
+        client = self._ensure()
+        ends = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                r = await client.get(
+                    url, params=params, headers=headers, timeout=max(0.05, ends - time.monotonic())
+                )
+            except httpx.TimeoutException as e:
+                raise requests.Timeout(str(e) or "timed out") from e
+            except httpx.HTTPError as e:
+                raise requests.ConnectionError(str(e) or type(e).__name__) from e
+            if r.status_code not in EspnClient.RETRY_STATUSES:
+                return r
+            pause = self.sync._pause(attempt, r)
+            if pause is None or time.monotonic() + pause >= ends:
+                return r
+            await asyncio.sleep(pause)
+
+    async def _fetch(self, cfg, params, season, keep, validators, view):
+        with _UpstreamCall(self.sync) as call:
+            for host, url, timeout in call.attempts(cfg, season):
+                headers = _request_headers(cfg, validators)
+                headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in _cookies(cfg).items())
+                try:
+                    r = await self._get(url, params, headers, timeout)
+                except requests.RequestException as e:
+                    call.failed(host, e, timeout)
+                    continue
+                digest = call.answered(host, url, r, validators)
+                if digest is None:
+                    continue
+                if digest is UNCHANGED:
+                    return UNCHANGED
+                # parse off the loop: a full mRoster takes long enough to stall it
+                with metrics.timed("espn_parse_seconds", "parse", view=view):
+                    if keep is None:
+                        data = await asyncio.to_thread(json.loads, r.content)
+                    else:
+                        data = await asyncio.to_thread(
+                            json.loads,
+                            r.content,
+                            object_pairs_hook=lambda pairs: {k: v for k, v in pairs if k in keep},
+                        )
+                return _validated(data, r, digest, validators)
+            raise call.last_err
+
+
+
+_aclient: AsyncEspnClient | None = None
+
+
+def async_espn_client(cfg) -> AsyncEspnClient:
+    global _aclient
+    if _aclient is None:
+        _aclient = AsyncEspnClient(espn_client(cfg))
+    return _aclient
+
+
+def _validated(data, r, digest: bytes, validators: Tuple | None):
+    # only loads for the snapshot cache keep validators, on their cache entry
+    if validators is None:
+        return data
+    return Validated(data, (r.headers.get("ETag"), r.headers.get("Last-Modified"), digest))
+
+
+def _get_json(
+    cfg,
+    params: Dict[str, str],
+    season: int,
+    keep: frozenset | None = None,
+    validators: Tuple | None = None,
+):
+    return espn_client(cfg).get_json(cfg, params, season, keep, validators)
+
+
+def _compact_draft(draft: Dict) -> Dict:
+    detail = draft.get("draftDetail") or {}
+    return {
+        "draftDetail": {
+            "drafted": detail.get("drafted"),
+            "picks": [
+                {k: p.get(k) for k in DRAFT_PICK_KEYS}
+                for p in detail.get("picks") or []
+            ],
+        }
+    }
+
+
+# one snapshot cache per league, least recently used leagues evicted; editing
+# the league's entry in the leagues file starts a new one (its refresh jobs
+# close over the old config, credentials included, and stop with the old cache)
+_caches = LRU()
+
+
+def snapshot_cache(cfg) -> SnapshotCache:
+    _caches.maxsize = cfg.get("TENANT_CACHE_SIZE", 32)
+    return _caches.get_or_create(
+        cfg["LEAGUE_ID"],
+        lambda: SnapshotCache(
+            ttl=cfg.get("ESPN_CACHE_TTL", 300),
+            stale_ttl=cfg.get("ESPN_CACHE_STALE_TTL", 3600),
+        ),
+        tag=tenant_fingerprint(cfg),
+    )
+
+
+def _cache_key(cfg, params: Dict, season: int) -> Tuple:
+    view = params.get("view")
+    if isinstance(view, (list, tuple)):
+        view = "+".join(view)
+    return (cfg["LEAGUE_ID"], season, view, params.get("scoringPeriodId"))
+
+
+_store: SnapshotStore | None = None
+
+
+def snapshot_store(cfg) -> SnapshotStore | None:
+    global _store
+    root = cfg.get("SNAPSHOT_DIR")
+    if not root:
+        return None
+    if _store is None or _store.root != root:
+        _store = SnapshotStore(root)
+    return _store
+
+
+def _season_finalized(cfg, season: int) -> bool:
+    # earlier seasons are history; the current one only once the commissioner says so
+    current = cfg.get("CURRENT_SEASON", cfg["LAST_SEASON"])
+    return season < current or bool(cfg.get("SEASON_FINALIZED"))
+
+
+_refresher = Refresher()
+# Set while a shared-snapshot follower builds its own index: those loads are
+# one-offs, not refresher jobs polling ESPN for the life of the process (the
+# refresher's file is what keeps followers current).
+_untracked: contextvars.ContextVar[bool] = contextvars.ContextVar("espn_untracked", default=False)
+
+
+def _refresh_interval(cfg, view: str) -> float | None:
+    # combined views refresh as often as their most volatile part
+    intervals = cfg.get("ESPN_REFRESH_INTERVALS") or {}
+    found = [intervals[v] for v in str(view).split("+") if v in intervals]
+    return min(found) if found else None
+
+
+def _cached_validators(cfg, params: Dict, season: int) -> Tuple:
+    # what a load for the snapshot cache sends ESPN: the validators of the
+    # cached copy it would keep serving on "unchanged", () when there is none
+    entry = snapshot_cache(cfg).peek(_cache_key(cfg, params, season))
+    return (entry.validators or ()) if entry is not None else ()
+
+
+def _cached(cfg, params: Dict, season: int, loader: Callable[[], Dict]):
+    """
+    Snapshot-cache lookup. Finalized seasons read through the on-disk store
+    first (falling back to loader and persisting the result) and never expire;
+    live ones are kept fresh by the background refresher when their view has
+    an ESPN_REFRESH_INTERVALS entry (unless loaded by _fallback_index).
+    """
+    key = _cache_key(cfg, params, season)
+    cache = snapshot_cache(cfg)
+    store = snapshot_store(cfg)
+    if not _season_finalized(cfg, season):
+        interval = _refresh_interval(cfg, key[2])
+        if interval and not _untracked.get():
+            _refresher.track(key, cache, loader, interval, lambda: _caches.peek(key[0]) is cache)
+        return cache.get(key, loader)
+    if store is None:
+        return cache.get(key, loader)
+
+    league, view, sp = key[0], key[2], key[3]
+    name = f"{view}@{sp}" if sp else view
+
+    def load():
+        data = store.load(league, season, name)
+        if data is None:
+            data = loader()
+            if data is not UNCHANGED:
+                store.save(league, season, name, data.value if isinstance(data, Validated) else data)
+        return data
+
+    return cache.get(key, load, ttl=math.inf)
+
+
+def _get_json_cached(cfg, params: Dict[str, str], season: int, keep: frozenset | None = None):
+    return _cached(
+        cfg,
+        params,
+        season,
+        lambda: _get_json(cfg, params, season, keep, _cached_validators(cfg, params, season)),
+    )
+
+
+# (league, season, scoringPeriodId) -> rostered entries at that period.
+# Only filled for completed seasons, whose rosters can no longer change.
+_period_counts: Dict[Tuple, int] = {}
+_period_counts_lock = threading.Lock()
+
+
+def _season_complete(cfg, settings: Dict, season: int) -> bool:
+    if _season_finalized(cfg, season):
+        return True
+    return (settings.get("status") or {}).get("isActive") is False
+
+
+# lineup slots a team may leave empty without being short-handed (21 = IR)
+RESERVE_SLOTS = frozenset({"21"})
+
+
+def _full_roster_total(settings: Dict) -> int | None:
+    """Rostered entries across the league when every non-IR slot is filled, if known."""
+    league_settings = settings.get("settings") or {}
+    slots = (league_settings.get("rosterSettings") or {}).get("lineupSlotCounts") or {}
+    size = league_settings.get("size")
+    if not slots or not isinstance(size, int):
+        return None
+    return size * sum(n for slot, n in slots.items() if str(slot) not in RESERVE_SLOTS)
+
+
+def _roster_count(cfg, season: int, sp: int, complete: bool) -> int:
+    key = (cfg["LEAGUE_ID"], season, sp)
+    if key in _period_counts:
+        return _period_counts[key]
+    try:
+        data = _get_json(
+            cfg, {"view": "mRoster", "scoringPeriodId": str(sp)}, season, ROSTER_KEYS
         )
-        if total:
-            candidates.append((sp, total))
-    if candidates:
-        candidates.sort(key=lambda x: (x[1], x[0]))  # by total, then highest sp
-        return candidates[-1][0]
-    return hint or 17
+    except (requests.RequestException, ValueError):
+        return 0  # period unavailable; not cached so it is retried next time
+    total = sum(
+        len((t.get("roster") or {}).get("entries") or [])
+        for t in data.get("teams", [])
+    )
+    if complete:
+        with _period_counts_lock:
+            _period_counts[key] = total
+    return total
+
+
+def _best_final_period(cfg, season: int, hint: int | None, settings: Dict | None = None) -> int:
+    # probe late-season periods; choose the one with the most total rostered entries.
+    # Raises ValueError when no period answered, so a guess never gets cached.
+    settings = settings or {}
+    complete = _season_complete(cfg, settings, season)
+    full = _full_roster_total(settings)
+    periods = list(range(22, max(12, (hint or 0)) - 1, -1))  # 22→hint (or 12)
+
+    workers = max(1, cfg.get("ESPN_PROBE_WORKERS", 4))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="espn-probe")
+    best: Tuple[int, int] | None = None  # (total, sp)
+    try:
+        # walk from the latest period down, one wave of `workers` periods at a
+        # time: the first full roster set can't be beaten (ties go to the later
+        # period), so stop there without requesting the periods below it
+        for start in range(0, len(periods), workers):
+            wave = periods[start:start + workers]
+            futures = [
+                pool.submit(contextvars.copy_context().run, _roster_count, cfg, season, sp, complete)
+                for sp in wave
+            ]
+            done = False
+            for sp, fut in zip(wave, futures):
+                total = fut.result()
+                if total and (best is None or total > best[0]):
+                    best = (total, sp)
+                if full and total >= full:
+                    done = True
+                    break
+            if done:
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    if best is None:
+        raise ValueError("no late-season scoring period returned rosters")
+    return best[1]
+
+
+def _final_period(cfg, settings: Dict) -> int | None:
+    """
+    Period whose rosters are the season's final ones: ESPN's finalScoringPeriod,
+    else 19 (safe fallback for 2023), or None when ESPN_PROBE_FINAL_PERIOD says
+    to probe for it (_best_final_period).
+    """
+    final_sp = (settings.get("status") or {}).get("finalScoringPeriod")
+    if isinstance(final_sp, int) and final_sp > 0:
+        return final_sp
+    return None if cfg.get("ESPN_PROBE_FINAL_PERIOD") else 19
+
+
+# Views that don't depend on the scoring period; ESPN accepts them as repeated
+# ?view= params in one request and merges them into a single league object.
+BASE_VIEWS = ("mSettings", "mDraftDetail", "mTeam")
+
+
+def _split_views(data: Dict) -> Dict[str, Dict]:
+    """Split a combined mSettings+mDraftDetail+mTeam payload into per-view blobs."""
+    if not isinstance(data.get("draftDetail"), dict) or not isinstance(data.get("teams"), list):
+        raise ValueError("combined view payload is missing draftDetail/teams")
+    return {
+        "mSettings": {
+            k: v for k, v in data.items() if k not in ("draftDetail", "teams", "members")
+        },
+        "mDraftDetail": _compact_draft(data),
+        "mTeam": {"teams": data["teams"], "members": data.get("members") or []},
+    }
+
+
+def _combined_views(data):
+    """Cache value for the combined BASE_VIEWS response (Validated or UNCHANGED)."""
+    if data is UNCHANGED:
+        return data
+    return Validated(_split_views(data.value), data.validators)
+
+
+def _separate_views(payloads: List[Dict]) -> Dict[str, Dict]:
+    """Cache value for the BASE_VIEWS fetched one request each, in BASE_VIEWS order."""
+    views = dict(zip(BASE_VIEWS, payloads))
+    views["mDraftDetail"] = _compact_draft(views["mDraftDetail"])
+    return views
+
+
+def _fetch_base_views(cfg, season: int, validators: Tuple = ()):
+    if cfg.get("ESPN_COMBINED_VIEWS", True):
+        try:
+            with deadline.share(2):  # leave time for the per-view fallback
+                data = _get_json(cfg, {"view": list(BASE_VIEWS)}, season, validators=validators)
+            return _combined_views(data)
+        except (requests.RequestException, ValueError):
+            pass  # ESPN rejected or trimmed the combined request; go view by view
+    client = espn_client(cfg)
+    futures = [client.submit(_get_json, cfg, {"view": v}, season) for v in BASE_VIEWS]
+    return _separate_views([f.result() for f in futures])
+
+
+def _base_views_cached(cfg, season: int):
+    params = {"view": BASE_VIEWS}
+    return _cached(
+        cfg,
+        params,
+        season,
+        lambda: _fetch_base_views(cfg, season, _cached_validators(cfg, params, season)),
+    )
+
+
+# cache key -> task loading it through the async client (one per key per loop)
+_aflights: Dict[Tuple, asyncio.Future] = {}
+
+
+async def _cached_async(cfg, params: Dict, season: int, loader: Callable):
+    """
+    Entry get() would answer for params right away, loading it with the async
+    loader first if needed. Callers wanting the same key share one load, which
+    carries on for the others if one of them is cancelled.
+    """
+    key = _cache_key(cfg, params, season)
+    cache = snapshot_cache(cfg)
+    entry = cache.lookup(key)
+    if entry is not None:
+        return entry
+    task = _aflights.get(key)
+    if task is None:
+
+        async def load():
+            return cache.put(key, await loader())
+
+        task = _aflights[key] = asyncio.ensure_future(load())
+        task.add_done_callback(lambda _: _aflights.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _fetch_base_views_async(cfg, season: int, validators: Tuple = ()):
+    client = async_espn_client(cfg)
+    if cfg.get("ESPN_COMBINED_VIEWS", True):
+        try:
+            with deadline.share(2):
+                data = await client.get_json(
+                    cfg, {"view": list(BASE_VIEWS)}, season, validators=validators
+                )
+            return _combined_views(data)
+        except (requests.RequestException, ValueError):
+            pass
+    return _separate_views(
+        await asyncio.gather(*(client.get_json(cfg, {"view": v}, season) for v in BASE_VIEWS))
+    )
+
+
+async def prefetch_league(cfg) -> None:
+    """
+    Load the live-season views fetch_league_blob needs with the async client,
+    so the player_index(cfg) that follows is answered from the cache instead of
+    blocking a thread on ESPN. Finalized seasons (read from disk, fetched once
+    ever) and final-period probing are left to the sync path.
+
+    With SHARED_SNAPSHOT_DIR, a worker that isn't the refresher first waits
+    (as a coroutine) for the refresher's file, the wait _shared_player_index
+    would otherwise spend sleeping in a thread.
+    """
+    season = cfg["LAST_SEASON"]
+    if _season_finalized(cfg, season):
+        return
+    if cfg.get("SHARED_SNAPSHOT_DIR"):
+        snap = shared_snapshot(cfg)
+        if snap.index() is not None:
+            return
+        if not snap.try_lead():
+            metrics.inc("shared_snapshot_waits_total")
+            wait_until = time.monotonic() + _shared_wait_seconds()
+            while time.monotonic() < wait_until:
+                await asyncio.sleep(0.1)
+                if os.path.exists(snap.path):
+                    return
+    params = {"view": BASE_VIEWS}
+    base = await _cached_async(
+        cfg,
+        params,
+        season,
+        lambda: _fetch_base_views_async(cfg, season, _cached_validators(cfg, params, season)),
+    )
+    final_sp = _final_period(cfg, base.value["mSettings"])
+    if final_sp is None:
+        return
+    roster = {"view": "mRoster", "scoringPeriodId": str(final_sp)}
+    await _cached_async(
+        cfg,
+        roster,
+        season,
+        lambda: async_espn_client(cfg).get_json(
+            cfg, roster, season, ROSTER_KEYS, _cached_validators(cfg, roster, season)
+        ),
+    )
 
 
 def fetch_league_blob(cfg) -> Dict:
+    with metrics.timed("league_blob_seconds", "blob"):
+        return _fetch_league_blob(cfg)
+
+
+def _fetch_league_blob(cfg) -> Dict:
     # For keeper eligibility, we need data from the season that just ended
     # If we're checking eligibility for 2025 season, we need 2024 data
     # So LAST_SEASON should be the season we want data from
     season = cfg["LAST_SEASON"]  # Use the specified season for all data
 
-    settings = _get_json(cfg, {"view": "mSettings"}, season)
-    final_sp = (settings.get("status") or {}).get("finalScoringPeriod")
-    if not isinstance(final_sp, int) or final_sp <= 0:
-        final_sp = 19  # safe fallback for 2023
-
-    # Get draft data from the same season (2023)
-    draft = _get_json(cfg, {"view": "mDraftDetail"}, season)
+    # settings, draft and team metadata in one request (see BASE_VIEWS); only
+    # that combined request is capped (at half the budget, so the per-view
+    # fallback and the roster request keep the rest), see _fetch_base_views
+    base_e = _base_views_cached(cfg, season)
+    settings = base_e.value["mSettings"]
+    final_sp = _final_period(cfg, settings)
+    if final_sp is None:
+        # cached (and persisted for finalized seasons) like any other view
+        hint = (settings.get("status") or {}).get("latestScoringPeriod")
+        try:
+            with deadline.share(2):
+                final_sp = _cached(
+                    cfg,
+                    {"view": "finalScoringPeriod"},
+                    season,
+                    lambda: _best_final_period(cfg, season, hint, settings),
+                ).value
+        except ValueError:
+            final_sp = hint or 17  # probes failed: guess for now, probe again next load
 
     # IMPORTANT: fetch rosters using only mRoster, at ESPN's final period
-    roster = _get_json(
-        cfg, {"view": "mRoster", "scoringPeriodId": str(final_sp)}, season
+    roster_e = _get_json_cached(
+        cfg, {"view": "mRoster", "scoringPeriodId": str(final_sp)}, season, ROSTER_KEYS
     )
 
-    # Team names/metadata (separate call) - use same season
-    teams_meta = _get_json(cfg, {"view": "mTeam"}, season)
-
     return {
         "settings": settings,
-        "draft": draft,
-        "roster": roster,
-        "teams_meta": teams_meta,
+        "draft": base_e.value["mDraftDetail"],
+        "roster": roster_e.value,
+        "teams_meta": base_e.value["mTeam"],
         "final_scoring_period": final_sp,
+        # changes whenever any of the underlying cached views is refreshed
+        "version": max(base_e.version, roster_e.version),
     }
 
 
-def build_player_index(cfg) -> Dict[str, PlayerRec]:
-    blob = fetch_league_blob(cfg)
+def team_key(cfg, espn_team_id) -> str | None:
+    """Internal team key for an ESPN team id; leagues without a team map use the id."""
+    team_map = cfg.get("TEAM_ID_MAP", TEAM_ID_MAP)
+    if not team_map:
+        return None if espn_team_id is None else str(espn_team_id)
+    return team_map.get(espn_team_id)
+
+
+def _draft_cached(cfg, season: int):
+    params = {"view": "mDraftDetail"}
+
+    def load():
+        data = _get_json(cfg, params, season, validators=_cached_validators(cfg, params, season))
+        return data if data is UNCHANGED else Validated(_compact_draft(data.value), data.validators)
+
+    return _cached(cfg, params, season, load)
+
+
+# league -> kept player ids for its past seasons
+_histories = LRU()
+
+
+def keep_history(cfg, draft: Dict | None = None) -> Dict[int, int]:
+    """
+    ESPN player id -> consecutive seasons kept, ending with LAST_SEASON, from
+    the keeper flags on each season's draft picks. Looks back to FIRST_SEASON
+    when set, otherwise just far enough to apply the max_seasons_kept rule.
+    Past drafts are fetched in parallel once (and persisted as finalized
+    seasons); later calls only fetch seasons not seen before.
+    """
+    season = cfg["LAST_SEASON"]
+    if draft is None:
+        draft = _draft_cached(cfg, season).value
+    rules = cfg.get("KEEPER_RULES", DEFAULT_RULES)
+    first = cfg.get("FIRST_SEASON") or season - rules.max_seasons_kept
+    _histories.maxsize = cfg.get("TENANT_CACHE_SIZE", 32)
+    history = _histories.get_or_create(cfg["LEAGUE_ID"], KeepHistory)
+
+    client = espn_client(cfg)
+    futures = {s: client.submit(_draft_cached, cfg, s) for s in history.missing(range(first, season))}
+    for s, fut in futures.items():
+        try:
+            history.add(s, kept_player_ids(fut.result().value))
+        except (requests.RequestException, ValueError):
+            pass  # season before the league existed or ESPN unavailable; retried next build
+
+    kept = {s: history.get(s) or frozenset() for s in range(first, season)}
+    kept[season] = kept_player_ids(draft)
+    return seasons_kept(kept, season)
+
+
+def build_player_index(cfg, blob: Dict | None = None) -> PlayerIndex:
+    if blob is None:
+        blob = fetch_league_blob(cfg)
+    with metrics.timed("index_build_seconds", "index"):
+        return _build_player_index(cfg, blob)
+
+
+def _build_player_index(cfg, blob: Dict) -> PlayerIndex:
 
     # draft picks → playerId → round
     picks = (blob.get("draft", {}) or {}).get("draftDetail", {}).get("picks", []) or []
@@ -130,37 +976,243 @@ def build_player_index(cfg) -> Dict[str, PlayerRec]:
             pid, full = athlete.get("id"), athlete.get("fullName")
             if not isinstance(pid, int) or not full:
                 continue
-            rec = players.get(pid) or PlayerRec(pid, full)
+            # interned so rebuilt snapshots and the name index share one copy
+            rec = players.get(pid) or PlayerRec(pid, sys.intern(full))
             rec.espn_team_id = espn_tid
-            rec.final_team_id = TEAM_ID_MAP.get(
-                espn_tid
-            )  # numeric ESPN id → your internal key
+            rec.final_team_id = team_key(cfg, espn_tid)  # numeric ESPN id → your internal key
             rec.draft_round = draft_round_by_player.get(pid)
+            points = (entry.get("playerPoolEntry", {}) or {}).get("appliedStatTotal")
+            if isinstance(points, (int, float)):
+                rec.points = float(points)
             players[pid] = rec
 
     for rec in players.values():
         if rec.draft_round is None:
             rec.originally_undrafted = True
-    for pid, count in SEASONS_KEPT_OVERRIDES.items():
+    if cfg.get("AUTO_SEASONS_KEPT", True):
+        for pid, count in keep_history(cfg, blob.get("draft")).items():
+            if pid in players:
+                players[pid].seasons_kept = count
+    # hand-maintained corrections win over what the drafts say
+    for pid, count in cfg.get("SEASONS_KEPT_OVERRIDES", SEASONS_KEPT_OVERRIDES).items():
         if pid in players:
             players[pid].seasons_kept = count
 
-    return {rec.name.lower(): rec for rec in players.values()}
+    return PlayerIndex(
+        blob.get("version", 0), players.values(), blob.get("final_scoring_period")
+    )
+
+
+# (league, season) -> PlayerIndex for that tenant's latest snapshot
+_indexes = LRU()
+# (league, season) -> lock serializing that tenant's rebuilds, so one league's
+# slow build (e.g. a cold keeper-history fetch) never holds up the others
+_index_locks: Dict[Tuple, threading.Lock] = {}
+_index_lock = threading.Lock()  # guards _index_locks
+
+
+def _tenant_index_lock(key: Tuple) -> threading.Lock:
+    with _index_lock:
+        lock = _index_locks.get(key)
+        if lock is None:
+            lock = _index_locks[key] = threading.Lock()
+        return lock
+
+
+def player_index(cfg) -> PlayerIndex:
+    """Index for the tenant's current snapshot (from the shared file if SHARED_SNAPSHOT_DIR is set)."""
+    if cfg.get("SHARED_SNAPSHOT_DIR"):
+        return _shared_player_index(cfg)
+    return _local_player_index(cfg)
+
+
+def _local_player_index(cfg) -> PlayerIndex:
+    """This process's index for the current snapshot; rebuilt only when its version changes."""
+    key, tag = (cfg["LEAGUE_ID"], cfg["LAST_SEASON"]), tenant_fingerprint(cfg)
+    blob = fetch_league_blob(cfg)
+    idx = _indexes.get(key, tag)
+    if idx is not None and idx.version == blob["version"]:
+        return idx
+    with _tenant_index_lock(key):
+        idx = _indexes.get(key, tag)
+        if idx is None or idx.version != blob["version"]:
+            _indexes.maxsize = cfg.get("TENANT_CACHE_SIZE", 32)
+            idx = build_player_index(cfg, blob)
+            _indexes.put(key, idx, tag)  # swapped in one assignment
+        return idx
+
+
+# (league, season) -> that tenant's cross-worker snapshot file
+_shared = LRU(on_evict=SharedSnapshot.close)
+
+
+def shared_snapshot(cfg) -> SharedSnapshot:
+    league, season = cfg["LEAGUE_ID"], cfg["LAST_SEASON"]
+    fingerprint = tenant_fingerprint(cfg)
+    # a file per config version: a worker that hasn't seen an edit to the
+    # leagues file yet keeps publishing the old table where nobody reads it
+    name = f"{league}-{season}-{fingerprint}.snap" if fingerprint else f"{league}-{season}.snap"
+    _shared.maxsize = cfg.get("TENANT_CACHE_SIZE", 32)
+    return _shared.get_or_create(
+        (league, season),
+        lambda: SharedSnapshot(os.path.join(cfg["SHARED_SNAPSHOT_DIR"], name)),
+        tag=fingerprint,
+    )
+
+
+def _publish_shared(cfg, snap: SharedSnapshot) -> None:
+    idx = _local_player_index(cfg)
+    teams = _base_views_cached(cfg, cfg["LAST_SEASON"]).value["mTeam"].get("teams") or []
+    meta = {
+        "final_scoring_period": idx.final_scoring_period,
+        # just what dropdown_teams reads
+        "teams": [{k: t.get(k) for k in ("id", "name", "location", "nickname")} for t in teams],
+    }
+    snap.publish(idx.by_id.values(), meta)
+
+
+def _shared_wait_seconds() -> float:
+    """
+    How long a follower waits for the refresher's first file before fetching
+    itself: at most 10 s, and half of what is left of the request budget so
+    that fetch still has time.
+    """
+    left = deadline.remaining()
+    return 10.0 if left is None else max(0.0, min(left / 2, 10.0))
+
+
+def _blob_cached(cfg) -> bool:
+    """Whether fetch_league_blob would be answered from the snapshot cache, without ESPN."""
+    season = cfg["LAST_SEASON"]
+    cache = snapshot_cache(cfg)
+    base = cache.lookup(_cache_key(cfg, {"view": BASE_VIEWS}, season))
+    if base is None:
+        return False
+    final_sp = _final_period(cfg, base.value["mSettings"])
+    if final_sp is None:
+        probed = cache.lookup(_cache_key(cfg, {"view": "finalScoringPeriod"}, season))
+        if probed is None:
+            return False
+        final_sp = probed.value
+    roster = {"view": "mRoster", "scoringPeriodId": str(final_sp)}
+    return cache.lookup(_cache_key(cfg, roster, season)) is not None
+
+
+def _shared_player_index(cfg) -> PlayerIndex:
+    """
+    Index decoded from the tenant's shared snapshot file. The elected worker
+    fetches from ESPN and publishes; the others only read the file, falling
+    back to their own index if none shows up within the request budget (or
+    right away when this process has the league data cached, e.g. prefetched
+    by the ASGI entry point, so building it costs no ESPN calls).
+    """
+    snap = shared_snapshot(cfg)
+    if snap.try_lead() and not snap.publishing:
+        interval = cfg.get("SHARED_PUBLISH_INTERVAL", 30)
+        if snap.index() is None:
+            try:
+                _publish_shared(cfg, snap)
+            except (requests.RequestException, ValueError):
+                pass  # the publisher retries; followers fall back below
+            snap.start_publishing(lambda: _publish_shared(cfg, snap), interval)
+        else:
+            # A file persisted by an earlier process (e.g. before the host
+            # scaled to zero): serve it now and refresh from ESPN in the background.
+            snap.start_publishing(lambda: _publish_shared(cfg, snap), interval, now=True)
+    idx = snap.index()
+    if idx is not None:
+        return idx
+    if _blob_cached(cfg):
+        return _fallback_index(cfg)
+    metrics.inc("shared_snapshot_waits_total")
+    wait_until = time.monotonic() + _shared_wait_seconds()
+    while time.monotonic() < wait_until:
+        time.sleep(0.1)
+        idx = snap.index()
+        if idx is not None:
+            return idx
+    metrics.inc("shared_snapshot_fallbacks_total")
+    return _fallback_index(cfg)
+
+
+def _fallback_index(cfg) -> PlayerIndex:
+    # this process's own index, without leaving refresher jobs behind
+    token = _untracked.set(True)
+    try:
+        return _local_player_index(cfg)
+    finally:
+        _untracked.reset(token)
+
+
+def _reset_locks_after_fork() -> None:
+    # The boot warm-up thread may hold one of these when gunicorn forks; the
+    # child only has the forking thread, so give it fresh, unlocked copies.
+    global _client_lock, _period_counts_lock, _index_lock, _index_locks
+    _client_lock = threading.Lock()
+    _period_counts_lock = threading.Lock()
+    _index_lock = threading.Lock()
+    _index_locks = {}
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def warm_up(cfg, timeout: float = 20) -> bool:
+    """
+    Load the league snapshot and player index, waiting at most timeout seconds.
+    Called at import time under gunicorn --preload so workers fork with a hot
+    cache; on timeout or ESPN errors the app simply loads lazily per request.
+    """
+    done = threading.Event()
+    ok = []
+
+    def run():
+        try:
+            player_index(cfg)
+            ok.append(True)
+        except Exception:
+            pass
+        finally:
+            done.set()
+
+    # bound the ESPN calls too, so the thread doesn't hang on past the wait
+    ctx = contextvars.copy_context()
+    ctx.run(deadline.start, timeout)
+    threading.Thread(target=ctx.run, args=(run,), name="espn-warmup", daemon=True).start()
+    return done.wait(timeout) and bool(ok)
 
 
-def player_index_by_name(cfg) -> Dict[str, PlayerRec]:
-    return build_player_index(cfg)
+def player_index_by_name(cfg) -> Mapping[str, PlayerRec]:
+    return player_index(cfg).by_name
 
 
-def dropdown_teams(cfg) -> List[Dict[str, str]]:
-    """Return dropdown items built from ESPN team names, mapped to your stable keys."""
+def dropdown_teams(cfg, wait: bool = True) -> List[Dict[str, str]] | None:
+    """
+    Return dropdown items built from ESPN team names, mapped to your stable keys.
+    With wait=False only already-cached team data is used: when there is none,
+    a background load is started and None returned, so callers never block on ESPN.
+    """
     # Use the same season data for team names
     season = cfg["LAST_SEASON"]
-    teams_meta = _get_json(cfg, {"view": "mTeam"}, season)
+    if cfg.get("SHARED_SNAPSHOT_DIR"):
+        snap = shared_snapshot(cfg)
+        if wait:
+            player_index(cfg)
+        elif snap.index() is None:
+            return None
+        teams_meta = {"teams": snap.meta.get("teams") or []}
+    elif wait:
+        teams_meta = _base_views_cached(cfg, season).value["mTeam"]
+    else:
+        entry = snapshot_cache(cfg).peek(_cache_key(cfg, {"view": BASE_VIEWS}, season))
+        if entry is None:
+            espn_client(cfg).submit(_base_views_cached, cfg, season)
+            return None
+        teams_meta = entry.value["mTeam"]
     items = []
     for t in teams_meta.get("teams") or []:
         tid = t.get("id")
-        key = TEAM_ID_MAP.get(tid)
+        key = team_key(cfg, tid)
         if not key:
             continue
         # Prefer full name; fallback to location+nickname
@@ -0,0 +1,246 @@
+# app/services/events.py
+from __future__ import annotations
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+from . import metrics
+from ..config.leagues import tenant_fingerprint
+from .cache import LRU
+from .eligibility import LeagueEligibility, league_eligibility
+from .espn import dropdown_teams, player_index
+
+# seconds between keep-alive comments, so proxies don't drop idle streams
+KEEPALIVE = 15
+# the same for WSGI streams: a write is the only way a WSGI app learns the
+# client went away, and until then the stream keeps its thread and its slot
+WSGI_KEEPALIVE = 3
+# set in the environ by the ASGI entry point, whose streams cost no thread
+ASGI_ENVIRON_KEY = "keeper.asgi"
+# events a subscriber may fall behind by before it is dropped (it reconnects
+# and gets a reload event)
+BACKLOG = 64
+
+
+def sse(event: str, data: Dict, id: Optional[int] = None) -> bytes:
+    """One server-sent event, encoded."""
+    head = f"id: {id}\n" if id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+def team_diffs(old: LeagueEligibility, new: LeagueEligibility) -> List[Dict]:
+    """Per-team changes between two eligibility tables: added, removed and changed players."""
+    diffs = []
+    for key in list(new.teams) + [k for k in old.teams if k not in new.teams]:
+        before = {row["player_id"]: row for row in old.teams.get(key, ())}
+        after = {row["player_id"]: row for row in new.teams.get(key, ())}
+        added = [row for pid, row in after.items() if pid not in before]
+        removed = [pid for pid in before if pid not in after]
+        changed = [row for pid, row in after.items() if pid in before and before[pid] != row]
+        if added or removed or changed:
+            diffs.append(
+                {
+                    "team_key": key,
+                    "team_name": new.team_names.get(key, key),
+                    "version": new.version,
+                    "added": added,
+                    "removed": removed,
+                    "changed": changed,
+                }
+            )
+    return diffs
+
+
+class LeagueFeed:
+    """
+    Roster/eligibility changes of one tenant, pushed to every subscriber.
+
+    While anyone is subscribed, one watcher thread checks the snapshot
+    version every `interval` seconds (a cache lookup; the ESPN polling is the
+    refresher's job). On a new version it diffs the league eligibility table
+    against the previous one once, encodes one event per changed team plus a
+    version event, and hands the same bytes to every subscriber.
+    """
+
+    def __init__(self, cfg, interval: float = 5):
+        self.cfg = cfg
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Callable[[bytes], bool]] = {}
+        self._ids = 0
+        self._table: Optional[LeagueEligibility] = None
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._table.version if self._table is not None else None
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def __contains__(self, sub: int) -> bool:
+        return sub in self._subscribers
+
+    def _current(self) -> LeagueEligibility:
+        idx = player_index(self.cfg)
+        try:
+            teams = self.cfg["TEAMS"] or dropdown_teams(self.cfg)
+        except Exception:
+            teams = []
+        return league_eligibility(self.cfg, idx, teams)
+
+    def prime(self) -> None:
+        """Load the current table if there is none yet (raises on ESPN errors)."""
+        if self._table is None:
+            table = self._current()
+            with self._lock:
+                if self._table is None:
+                    self._table = table
+
+    def subscribe(self, deliver: Callable[[bytes], bool], last_id: Optional[str] = None) -> int:
+        """
+        Register deliver(chunk) -> accepted. It is called right away with the
+        hello event (or a reload when last_id, from Last-Event-ID, is a version
+        whose changes this feed can't replay), then with every later change.
+        A subscriber whose deliver refuses a chunk is dropped.
+        """
+        self.prime()
+        with self._lock:
+            self._ids += 1
+            sub = self._ids
+            version = self._table.version
+            if last_id and last_id != str(version):
+                deliver(sse("reload", {"version": version}, version))
+            deliver(b"retry: 5000\n" + sse("hello", {"version": version}, version))
+            self._subscribers[sub] = deliver
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._watch, name="events", daemon=True)
+                self._watcher.start()
+        metrics.inc("events_subscriptions_total")
+        return sub
+
+    def unsubscribe(self, sub: int) -> None:
+        with self._lock:
+            self._subscribers.pop(sub, None)
+
+    def close(self) -> None:
+        """Drop every subscriber (evicted or replaced feed); their streams end and reconnect."""
+        with self._lock:
+            self._subscribers.clear()
+
+    def _watch(self) -> None:
+        pid = os.getpid()
+        while os.getpid() == pid:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._subscribers:
+                    self._watcher = None
+                    return
+            try:
+                table = self._current()
+            except Exception:
+                continue  # ESPN trouble; subscribers keep what they have
+            if table.version != self._table.version:
+                self.publish(table)
+
+    def publish(self, table: LeagueEligibility) -> None:
+        """Diff table against the last one sent and push the changes."""
+        old, self._table = self._table, table
+        chunks = [sse("team", d, table.version) for d in team_diffs(old, table)]
+        chunks.append(sse("version", {"version": table.version}, table.version))
+        payload = b"".join(chunks)
+        metrics.inc("events_published_total", len(chunks))
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for sub, deliver in subscribers:
+            if not deliver(payload):
+                metrics.inc("events_dropped_total")
+                self.unsubscribe(sub)
+
+
+# (league, season) -> that tenant's feed, replaced when its config is edited
+_feeds = LRU(on_evict=LeagueFeed.close)
+
+
+def league_feed(cfg) -> LeagueFeed:
+    _feeds.maxsize = cfg.get("TENANT_CACHE_SIZE", 32)
+    return _feeds.get_or_create(
+        (cfg["LEAGUE_ID"], cfg["LAST_SEASON"]),
+        lambda: LeagueFeed(dict(cfg), cfg.get("EVENTS_POLL_INTERVAL", 5)),
+        tag=tenant_fingerprint(cfg),
+    )
+
+
+# streams currently holding a WSGI thread in this process
+_open = 0
+_open_lock = threading.Lock()
+
+
+def open_streams() -> int:
+    return _open
+
+
+def live_updates(environ: Dict, cfg) -> bool:
+    """Whether pages should subscribe to /api/events: always under ASGI, under WSGI only when streams are allowed."""
+    return bool(environ.get(ASGI_ENVIRON_KEY)) or cfg.get("EVENTS_MAX_STREAMS", 0) > 0
+
+
+def stream(feed: LeagueFeed, last_id: Optional[str], max_seconds: float) -> Iterator[bytes]:
+    """
+    SSE body for a WSGI response. Holds its thread for up to max_seconds,
+    then ends; EventSource reconnects with Last-Event-ID and either resumes or
+    is told to reload.
+    """
+    global _open
+    q: queue.Queue = queue.Queue(BACKLOG)
+
+    def deliver(chunk: bytes) -> bool:
+        try:
+            q.put_nowait(chunk)
+            return True
+        except queue.Full:
+            return False
+
+    sub = feed.subscribe(deliver, last_id)
+    with _open_lock:
+        _open += 1
+    ends = time.monotonic() + max_seconds
+    try:
+        while sub in feed or not q.empty():
+            left = ends - time.monotonic()
+            if left <= 0:
+                return
+            try:
+                yield q.get(timeout=min(WSGI_KEEPALIVE, left))
+            except queue.Empty:
+                yield b": keep-alive\n\n"
+    finally:
+        feed.unsubscribe(sub)
+        with _open_lock:
+            _open -= 1
+
+
+async def stream_async(feed: LeagueFeed, last_id: Optional[str]) -> AsyncIterator[bytes]:
+    """SSE body for the ASGI entry point: the subscriber is a coroutine, not a thread."""
+    loop = asyncio.get_running_loop()
+    q: asyncio.Queue = asyncio.Queue()
+
+    def deliver(chunk: bytes) -> bool:
+        # called from the watcher thread; the queue belongs to the loop
+        if q.qsize() >= BACKLOG:
+            return False
+        loop.call_soon_threadsafe(q.put_nowait, chunk)
+        return True
+
+    sub = await asyncio.to_thread(feed.subscribe, deliver, last_id)
+    try:
+        while sub in feed or not q.empty():
+            try:
+                yield await asyncio.wait_for(q.get(), KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+    finally:
+        feed.unsubscribe(sub)
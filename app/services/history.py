@@ -0,0 +1,47 @@
+# app/services/history.py
+from __future__ import annotations
+import threading
+from typing import Dict, FrozenSet, Iterable, Mapping
+
+
+def kept_player_ids(draft: Dict) -> FrozenSet[int]:
+    """Player ids ESPN flagged as keepers in one season's mDraftDetail."""
+    picks = ((draft or {}).get("draftDetail") or {}).get("picks") or []
+    return frozenset(
+        p["playerId"] for p in picks if p.get("keeper") and isinstance(p.get("playerId"), int)
+    )
+
+
+class KeepHistory:
+    """
+    Kept player ids per past season for one league. Past drafts never change,
+    so seasons are only ever added; callers fetch just the ones missing().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kept: Dict[int, FrozenSet[int]] = {}
+
+    def missing(self, seasons: Iterable[int]) -> list:
+        return [s for s in seasons if s not in self._kept]
+
+    def add(self, season: int, kept: FrozenSet[int]) -> None:
+        with self._lock:
+            self._kept[season] = kept
+
+    def get(self, season: int) -> FrozenSet[int] | None:
+        return self._kept.get(season)
+
+
+def seasons_kept(kept_by_season: Mapping[int, FrozenSet[int]], season: int) -> Dict[int, int]:
+    """
+    For every player kept in `season`'s draft, the number of consecutive
+    seasons (ending with `season`) they have been kept.
+    """
+    counts: Dict[int, int] = {}
+    for pid in kept_by_season.get(season, ()):
+        n, s = 0, season
+        while pid in kept_by_season.get(s, ()):
+            n, s = n + 1, s - 1
+        counts[pid] = n
+    return counts
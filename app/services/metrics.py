@@ -0,0 +1,145 @@
+# app/services/metrics.py
+from __future__ import annotations
+import bisect
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Counters and histograms live per process (each gunicorn worker reports its
+# own), keyed by (name, sorted label pairs).
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# histogram bucket upper bounds, seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_counters: Dict[Key, float] = defaultdict(float)
+# key -> per-bucket counts (+ one overflow slot), then [sum, count]
+_histograms: Dict[Key, List[float]] = {}
+
+# (name, seconds) spans of the current request, for its Server-Timing header
+_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "server_timing", default=None
+)
+
+
+def _key(name: str, labels: Dict[str, str]) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """Add value to the counter name{labels}."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] += value
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Record one duration in the histogram name{labels}."""
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0, 0]
+        h[bisect.bisect_left(BUCKETS, seconds)] += 1
+        h[-2] += seconds
+        h[-1] += 1
+
+
+def counters() -> Dict[Key, float]:
+    with _lock:
+        return dict(_counters)
+
+
+@contextmanager
+def timed(name: str, span: str | None = None, **labels) -> Iterator[None]:
+    """
+    Time the block into histogram name{labels}; with span, also report it in
+    the current request's Server-Timing header under that name.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        observe(name, dt, **labels)
+        spans = _spans.get() if span else None
+        if spans is not None:
+            spans.append((span, dt))
+
+
+def start_request() -> contextvars.Token:
+    """Collect Server-Timing spans for this request (and pool threads it fans out to)."""
+    return _spans.set([])
+
+
+def end_request(token: contextvars.Token) -> None:
+    _spans.reset(token)
+
+
+def server_timing(total: float | None = None) -> str:
+    """Server-Timing header value, summing spans that share a name."""
+    merged: Dict[str, List[float]] = {}
+    for name, dt in _spans.get() or ():
+        m = merged.setdefault(name, [0.0, 0])
+        m[0] += dt
+        m[1] += 1
+    parts = [
+        f"{name};dur={dt * 1000:.1f}" + (f';desc="x{n}"' if n > 1 else "")
+        for name, (dt, n) in merged.items()
+    ]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+_INF = 'le="+Inf"'
+
+
+def _labels(pairs, extra: str = "") -> str:
+    items = [f'{k}="{v}"' for k, v in pairs]
+    if extra:
+        items.append(extra)
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+def render() -> str:
+    """Everything in the Prometheus text exposition format."""
+    with _lock:
+        counters_ = sorted(_counters.items())
+        histograms = sorted((k, list(v)) for k, v in _histograms.items())
+    lines: List[str] = []
+    typed = set()
+    for (name, pairs), value in counters_:
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_labels(pairs)} {value:g}")
+    for (name, pairs), h in histograms:
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS, h):
+            cumulative += n
+            le = 'le="%g"' % bound
+            lines.append(f"{name}_bucket{_labels(pairs, le)} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(pairs, _INF)} {h[-1]}")
+        lines.append(f"{name}_sum{_labels(pairs)} {h[-2]:.6f}")
+        lines.append(f"{name}_count{_labels(pairs)} {h[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def _after_fork_in_child() -> None:
+    # workers count their own traffic, not the master's warm-up
+    global _lock
+    _lock = threading.Lock()
+    _counters.clear()
+    _histograms.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,92 @@
+# app/services/name_search.py
+from __future__ import annotations
+import heapq
+import re
+import sys
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from ..keeper import PlayerRec
+from . import metrics
+
+_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "v"}
+_PUNCT = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_name(name: str) -> str:
+    """'Kenneth Walker III' / 'kenneth walker' / 'Kénneth  Walker' -> 'kenneth walker'."""
+    s = unicodedata.normalize("NFKD", name or "")
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    s = _PUNCT.sub("", s.replace("-", " "))  # Amon-Ra -> amon ra, Ja'Marr -> jamarr
+    tokens = s.split()
+    while len(tokens) > 1 and tokens[-1] in _SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def _trigrams(normalized: str) -> set:
+    # pad each token so leading grams ("  b", " bi") also act as a prefix match
+    grams = set()
+    for tok in normalized.split():
+        padded = f"  {tok} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameSearch:
+    """
+    Fuzzy player-name lookup built once per PlayerIndex. Names are normalized
+    up front, a trigram posting list narrows each query to a small candidate
+    set, and only those candidates are scored by rapidfuzz in a single call.
+    """
+
+    def __init__(self, players: Iterable[PlayerRec], max_candidates: int = 64):
+        self.max_candidates = max_candidates
+        self._recs: List[PlayerRec] = []
+        self._keys: List[str] = []
+        self._exact: Dict[str, List[PlayerRec]] = {}
+        self._postings: Dict[str, List[int]] = {}
+        for rec in players:
+            key = sys.intern(normalize_name(rec.name))
+            i = len(self._recs)
+            self._recs.append(rec)
+            self._keys.append(key)
+            self._exact.setdefault(key, []).append(rec)
+            for g in _trigrams(key):
+                self._postings.setdefault(sys.intern(g), []).append(i)
+
+    def exact(self, name: str) -> Optional[PlayerRec]:
+        """Unambiguous match after normalization ('Brian Thomas' -> 'Brian Thomas Jr.')."""
+        hits = self._exact.get(normalize_name(name)) or []
+        return hits[0] if len(hits) == 1 else None
+
+    def _candidates(self, key: str) -> List[int]:
+        counts: Counter = Counter()
+        for g in _trigrams(key):
+            counts.update(self._postings.get(g, ()))
+        if len(counts) <= self.max_candidates:
+            return list(counts)
+        return [i for i, _ in heapq.nlargest(self.max_candidates, counts.items(), key=lambda kv: kv[1])]
+
+    def search(
+        self, query: str, limit: int = 5, min_score: float = 0
+    ) -> List[Tuple[PlayerRec, float]]:
+        with metrics.timed("name_search_seconds", "search"):
+            key = normalize_name(query)
+            if not key:
+                return []
+            cands = self._candidates(key)
+            if not cands:
+                return []
+            # imported on first use: keeps it off the boot path (cold starts)
+            from rapidfuzz import fuzz, process
+
+            scored = process.extract(
+                key,
+                [self._keys[i] for i in cands],
+                scorer=fuzz.WRatio,
+                processor=None,  # keys are already normalized
+                limit=limit,
+                score_cutoff=min_score,
+            )
+            return [(self._recs[cands[pos]], score) for _, score, pos in scored]
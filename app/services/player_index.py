@@ -0,0 +1,55 @@
+# app/services/player_index.py
+from __future__ import annotations
+import sys
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+from ..keeper import PlayerRec
+from .name_search import NameSearch
+
+
+class PlayerIndex:
+    """
+    Lookups over one league snapshot: by lowercase name, ESPN player id and
+    internal team key. Built once per snapshot version and shared by all
+    request threads, so it is never mutated after construction — a newer
+    snapshot gets a brand new PlayerIndex that replaces this one.
+    """
+
+    __slots__ = (
+        "version", "final_scoring_period", "by_name", "by_id", "by_team", "search"
+    )
+
+    def __init__(
+        self,
+        version: int,
+        players: Iterable[PlayerRec],
+        final_scoring_period: Optional[int] = None,
+    ):
+        by_id: Dict[int, PlayerRec] = {rec.player_id: rec for rec in players}
+        by_team: Dict[str, List[PlayerRec]] = {}
+        for rec in by_id.values():
+            if rec.final_team_id:
+                by_team.setdefault(rec.final_team_id, []).append(rec)
+
+        self.version = version
+        self.final_scoring_period = final_scoring_period
+        self.by_id: Mapping[int, PlayerRec] = MappingProxyType(by_id)
+        self.by_name: Mapping[str, PlayerRec] = MappingProxyType(
+            {sys.intern(rec.name.lower()): rec for rec in by_id.values()}
+        )
+        self.by_team: Mapping[str, Tuple[PlayerRec, ...]] = MappingProxyType(
+            {key: tuple(recs) for key, recs in by_team.items()}
+        )
+        self.search = NameSearch(by_id.values())
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, name: str) -> Optional[PlayerRec]:
+        return self.by_name.get(name.strip().lower()) or self.search.exact(name)
+
+    def get_by_id(self, player_id: int) -> Optional[PlayerRec]:
+        return self.by_id.get(player_id)
+
+    def team(self, team_key: str) -> Tuple[PlayerRec, ...]:
+        return self.by_team.get(team_key, ())
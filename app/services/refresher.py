@@ -0,0 +1,92 @@
+# app/services/refresher.py
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable
+from .cache import SnapshotCache
+
+# longest the thread sleeps before re-checking its schedule
+_MAX_SLEEP = 60.0
+
+
+@dataclass
+class _Job:
+    cache: SnapshotCache
+    loader: Callable[[], Any]
+    interval: float
+    alive: Callable[[], bool]
+    due: float
+
+
+class Refresher:
+    """
+    Keeps tracked snapshot-cache keys warm from one daemon thread, each on its
+    own interval, so request threads find fresh entries instead of loading.
+
+    Refreshes go through SnapshotCache.refresh, so they share single-flight
+    with request-path loads and a loader answering UNCHANGED keeps the cached
+    version (nothing downstream rebuilds). Errors are swallowed; the key is
+    simply retried on its next tick and requests keep the cache's own TTLs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._jobs: Dict[Hashable, _Job] = {}
+        self._pid = None
+        os.register_at_fork(before=self._stop, after_in_child=self._after_fork_in_child)
+
+    def _stop(self) -> None:
+        # Forking (gunicorn --preload): the workers poll from now on, so the
+        # preloading parent's thread winds down instead of polling for nobody.
+        self._pid = None
+        self._wake.set()
+
+    def _after_fork_in_child(self) -> None:
+        # the thread stayed in the parent; start a new one on the next track()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def track(
+        self,
+        key: Hashable,
+        cache: SnapshotCache,
+        loader: Callable[[], Any],
+        interval: float,
+        alive: Callable[[], bool] = lambda: True,
+    ) -> None:
+        """Refresh key every interval seconds until alive() turns false."""
+        if self._pid == os.getpid() and key in self._jobs:
+            return
+        with self._lock:
+            if key not in self._jobs:
+                self._jobs[key] = _Job(cache, loader, interval, alive, time.monotonic() + interval)
+                self._wake.set()
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name="espn-refresher", daemon=True).start()
+
+    def _run(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            self._wake.clear()
+            now = time.monotonic()
+            with self._lock:
+                for key in [k for k, j in self._jobs.items() if not j.alive()]:
+                    del self._jobs[key]
+                due = [(k, j) for k, j in self._jobs.items() if j.due <= now]
+            for key, job in due:
+                try:
+                    job.cache.refresh(key, job.loader)
+                except Exception:
+                    pass
+                job.due = time.monotonic() + job.interval
+            with self._lock:
+                next_due = min((j.due for j in self._jobs.values()), default=now + _MAX_SLEEP)
+            self._wake.wait(max(0.0, min(next_due - time.monotonic(), _MAX_SLEEP)))
@@ -0,0 +1,240 @@
+# app/services/shared.py
+from __future__ import annotations
+import fcntl
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from ..keeper import PlayerRec
+from .player_index import PlayerIndex
+
+# File layout (little endian):
+#   header   magic, version, player count, meta length
+#   meta     JSON: final_scoring_period, trimmed mTeam teams
+#   records  one fixed-width row per player (REC)
+#   strings  UTF-8 names and team keys, referenced by (offset, length)
+MAGIC = b"KPSNAP1\0"
+HEADER = struct.Struct("<8sQII")
+# player_id, espn_team_id, draft_round, undrafted, seasons_kept, points,
+# name offset/length, team key offset/length
+REC = struct.Struct("<qihBBdIHIH")
+NONE_INT = -1
+NO_TEAM = 0xFFFF
+
+
+def serialize(players, meta: Dict, version: int) -> bytes:
+    meta_b = json.dumps(meta, sort_keys=True, separators=(",", ":")).encode()
+    pool = bytearray()
+    offsets: Dict[str, Tuple[int, int]] = {}
+
+    def ref(s: str) -> Tuple[int, int]:
+        if s not in offsets:
+            b = s.encode()
+            offsets[s] = (len(pool), len(b))
+            pool.extend(b)
+        return offsets[s]
+
+    rows = bytearray()
+    players = sorted(players, key=lambda r: r.player_id)
+    for r in players:
+        name_off, name_len = ref(r.name)
+        team_off, team_len = (0, NO_TEAM) if r.final_team_id is None else ref(r.final_team_id)
+        rows += REC.pack(
+            r.player_id,
+            NONE_INT if r.espn_team_id is None else r.espn_team_id,
+            NONE_INT if r.draft_round is None else r.draft_round,
+            r.originally_undrafted,
+            r.seasons_kept,
+            math.nan if r.points is None else r.points,
+            name_off, name_len, team_off, team_len,
+        )
+    header = HEADER.pack(MAGIC, version, len(players), len(meta_b))
+    return header + meta_b + bytes(rows) + bytes(pool)
+
+
+def deserialize(buf) -> Tuple[int, Dict, list]:
+    """(version, meta, [PlayerRec]) from a serialized snapshot (bytes or mmap)."""
+    magic, version, count, meta_len = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("not a shared snapshot file")
+    pos = HEADER.size
+    meta = json.loads(bytes(buf[pos : pos + meta_len]))
+    pos += meta_len
+    end = pos + count * REC.size
+    pool = bytes(buf[end:])
+    players = []
+    rows = REC.iter_unpack(buf[pos:end])
+    for pid, espn_tid, rnd, undrafted, kept, points, n_off, n_len, t_off, t_len in rows:
+        rec = PlayerRec(pid, sys.intern(pool[n_off : n_off + n_len].decode()))
+        rec.espn_team_id = None if espn_tid == NONE_INT else espn_tid
+        rec.final_team_id = None if t_len == NO_TEAM else pool[t_off : t_off + t_len].decode()
+        rec.draft_round = None if rnd == NONE_INT else rnd
+        rec.originally_undrafted = bool(undrafted)
+        rec.seasons_kept = kept
+        rec.points = None if math.isnan(points) else points
+        players.append(rec)
+    return version, meta, players
+
+
+class SharedSnapshot:
+    """
+    One tenant's player table shared by every worker through a file.
+
+    Whichever process holds an exclusive flock on <path>.lock is the refresher:
+    it builds the index from ESPN as usual and publish()es it, writing a temp
+    file and renaming it over <path> with a higher version, but only when the
+    content changed. Everyone else maps <path> read-only and
+    decodes it again only when the rename gave it a new inode. If the leader
+    dies its lock goes with it and the next follower to try takes over.
+    """
+
+    def __init__(self, path: str, elect_every: float = 5.0):
+        self.path = path
+        self.elect_every = elect_every
+        self._lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._last_elect = 0.0
+        self._stamp: Optional[Tuple[int, int]] = None  # (inode, mtime_ns) decoded
+        self._index: Optional[PlayerIndex] = None
+        self.meta: Dict = {}
+        self._publisher: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        os.register_at_fork(before=self._release, after_in_child=self._after_fork_in_child)
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+        self._lock_fd = None
+        self._last_elect = 0.0
+        self._publisher = None
+        self._closed = threading.Event()
+
+    def _release(self) -> None:
+        # Before forking: the parent gives up leadership (a forked copy of the
+        # locked fd would make parent and child both "hold" it); a worker
+        # takes over on its next try_lead().
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def close(self) -> None:
+        """
+        Stop publishing and give up leadership for good (the tenant was evicted;
+        a new SharedSnapshot for the same path can then take the lock).
+        """
+        self._closed.set()
+        with self._lock:
+            self._release()
+            # the fork hooks keep this object alive; don't let them keep the table
+            self._stamp, self._index, self.meta = None, None, {}
+
+    @property
+    def leader(self) -> bool:
+        return self._lock_fd is not None
+
+    def try_lead(self) -> bool:
+        """Become the refresher if nobody else is (checked at most every elect_every s)."""
+        if self._lock_fd is not None:
+            return True
+        if self._closed.is_set():
+            return False
+        now = time.monotonic()
+        if now - self._last_elect < self.elect_every:
+            return False
+        with self._lock:
+            if self._lock_fd is not None:
+                return True
+            if self._closed.is_set():
+                return False
+            self._last_elect = now
+            fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._lock_fd = fd
+            return True
+
+    @property
+    def publishing(self) -> bool:
+        return self._publisher is not None and self._publisher.is_alive()
+
+    def start_publishing(
+        self, publish: Callable[[], None], interval: float, now: bool = False
+    ) -> None:
+        """
+        While leader, call publish() every interval seconds from a daemon
+        thread (with now, also once right away).
+        """
+        if self.publishing:
+            return
+
+        closed = self._closed
+
+        def run():
+            if not now and closed.wait(interval):
+                return
+            while self._lock_fd is not None and not closed.is_set():
+                try:
+                    publish()
+                except Exception:
+                    pass  # ESPN trouble: keep the last published version
+                closed.wait(interval)
+
+        self._publisher = threading.Thread(target=run, name="snapshot-publisher", daemon=True)
+        self._publisher.start()
+
+    def publish(self, players, meta: Dict) -> bool:
+        """Write players/meta as the next version if they differ from the file; True if written."""
+        current = self._read_raw()
+        # millisecond clock, so versions keep increasing even if the file is
+        # deleted and rebuilt (workers key ETags and tables by version)
+        version = time.time_ns() // 1_000_000
+        if current is not None:
+            body = serialize(players, meta, 0)[HEADER.size :]
+            if current[HEADER.size :] == body:
+                return False
+            version = max(version, HEADER.unpack_from(current, 0)[1] + 1)
+        data = serialize(players, meta, version)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, self.path)
+        return True
+
+    def _read_raw(self) -> Optional[bytes]:
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def index(self) -> Optional[PlayerIndex]:
+        """Index for the newest published version, or None before the first publish."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns)
+        if stamp == self._stamp:
+            return self._index
+        with self._lock:
+            if stamp != self._stamp:
+                with open(self.path, "rb") as f, mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+                ) as mm:
+                    st = os.fstat(f.fileno())  # the file we actually read, if renamed meanwhile
+                    version, meta, players = deserialize(mm)
+                self._index = PlayerIndex(version, players, meta.get("final_scoring_period"))
+                self.meta = meta
+                self._stamp = (st.st_ino, st.st_mtime_ns)
+            return self._index
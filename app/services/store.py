@@ -0,0 +1,51 @@
+# app/services/store.py
+from __future__ import annotations
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Optional
+
+
+class SnapshotStore:
+    """
+    Gzipped JSON snapshots on disk, one file per (league, season, view):
+
+        <root>/<league>/<season>/<view>.json.gz
+
+    Only used for finalized seasons, so entries never expire. Writes go to a
+    temp file that is renamed into place, so readers (other workers, a
+    restarted container) never see a half-written snapshot.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, league, season: int, view: str) -> str:
+        return os.path.join(self.root, str(league), str(season), f"{view}.json.gz")
+
+    def load(self, league, season: int, view: str) -> Optional[Any]:
+        try:
+            with gzip.open(self._path(league, season, view), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            return None  # corrupt/partial file: treat as missing and refetch
+
+    def save(self, league, season: int, view: str, data: Any) -> bool:
+        path = self._path(league, season, view)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+            os.chmod(tmp, 0o644)  # mkstemp creates 0600
+            os.replace(tmp, path)
+            return True
+        except OSError:
+            return False  # read-only disk etc.; the in-memory cache still works
+
+    def clear(self, league, season: int) -> None:
+        shutil.rmtree(os.path.join(self.root, str(league), str(season)), ignore_errors=True)
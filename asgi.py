@@ -0,0 +1,9 @@
+# ASGI entry point: the same app as wsgi.py, with ESPN waits on asyncio
+# instead of gunicorn threads. Needs `pip install uvicorn httpx`:
+#   uvicorn asgi:app --workers 2 --port 5000
+import os
+
+from wsgi import app as flask_app
+from app.asgi import AsgiApp
+
+app = AsgiApp(flask_app, threads=int(os.environ.get("ASGI_THREADS", "8")))
@@ -0,0 +1,256 @@
+# bench/espn_standin.py
+# Local stand-in for the ESPN league endpoint, so the app can be run and
+# benchmarked without cookies or network access.
+#
+#   python bench/espn_standin.py serve [--port 8901] [--teams 10] [--roster 16]
+#          [--latency 0.15] [--jitter 0.05] [--fail-rate 0.02] [--stall-rate 0]
+#          [--fixtures DIR]
+#   python bench/espn_standin.py record --out DIR      # needs LEAGUE_ID/ESPN_* env
+#
+# Point the app at it with ESPN_API_HOSTS=http://127.0.0.1:8901.
+#
+# serve answers /apis/v3/games/ffl/seasons/<season>/segments/0/leagues/<league>
+# with a synthetic league of --teams x --roster players for mSettings,
+# mDraftDetail, mRoster and mTeam (several ?view= params are merged, like
+# ESPN does). Roster entries carry stats padding so payloads are ESPN-sized.
+# With --fixtures, <view>.json files recorded from a real league are served
+# instead of the synthetic ones. Responses carry an ETag and honor
+# If-None-Match. --fail-rate answers that share of requests with a 503,
+# --stall-rate holds them for 30s (to exercise timeouts). GET /_stats returns
+# the request count per view.
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VIEWS = ("mSettings", "mDraftDetail", "mRoster", "mTeam")
+LEAGUE_PATH = re.compile(r"^/apis/v3/games/ffl/seasons/(\d+)/segments/0/leagues/(\d+)$")
+
+FIRST = ["Bijan", "Ja'Marr", "Amon-Ra", "Brian", "Kenneth", "José", "Puka", "CeeDee",
+         "Travis", "Malik", "Chase", "Jayden", "Ladd", "Bucky", "Zach", "Xavier"]
+LAST = ["Robinson", "Chase", "St. Brown", "Thomas Jr.", "Walker III", "Núñez", "Nacua",
+        "Lamb", "Etienne", "Nabers", "Brown", "Daniels", "McConkey", "Irving", "Charbonnet"]
+
+
+def synthetic_league(teams: int, roster: int, seed: int = 7):
+    """{view: payload} for a league of teams x roster players."""
+    rng = random.Random(seed)
+    players = []  # (team_id, player_id, name)
+    pid = 4_000_000
+    for t in range(1, teams + 1):
+        for _ in range(roster):
+            pid += rng.randint(1, 97)
+            name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+            players.append((t, pid, name if rng.random() < 0.5 else f"{name} {pid % 1000}"))
+
+    rounds = roster
+    picks = []
+    drafted = [p for i, p in enumerate(players) if i % 7]  # some players are waiver pickups
+    rng.shuffle(drafted)
+    for n, (t, p, _) in enumerate(drafted[: teams * rounds]):
+        picks.append(
+            {"playerId": p, "roundId": n // teams + 1, "teamId": t, "keeper": rng.random() < 0.04,
+             "overallPickNumber": n + 1, "roundPickNumber": n % teams + 1, "autoDraftTypeId": 0,
+             "bidAmount": 0, "lineupSlotId": 0, "memberId": "{%08X}" % t, "reservedForKeeper": False}
+        )
+
+    def entry(p, name):
+        stats = [
+            {"seasonId": 2024, "scoringPeriodId": sp, "statSourceId": 0, "appliedTotal": rng.random() * 30,
+             "stats": {str(k): rng.random() * 10 for k in range(24)}}
+            for sp in range(0, 18, 3)
+        ]
+        return {
+            "playerId": p,
+            "lineupSlotId": 20,
+            "acquisitionType": "DRAFT",
+            "playerPoolEntry": {
+                "id": p,
+                "appliedStatTotal": round(rng.random() * 300, 2),
+                "ratings": {"0": {"positionalRanking": rng.randint(1, 60), "totalRating": rng.random()}},
+                "player": {
+                    "id": p, "fullName": name, "defaultPositionId": rng.randint(1, 5),
+                    "eligibleSlots": [2, 3, 23, 7, 20, 21], "proTeamId": rng.randint(1, 32),
+                    "ownership": {"percentOwned": rng.random() * 100}, "stats": stats,
+                },
+            },
+        }
+
+    return {
+        "mSettings": {
+            "id": 0, "seasonId": 2024,
+            "status": {"finalScoringPeriod": 17, "latestScoringPeriod": 18, "isActive": False},
+            "settings": {
+                "name": "Stand-in League", "size": teams,
+                "rosterSettings": {"lineupSlotCounts": {"0": 1, "2": 2, "4": 2, "6": 1, "16": 1,
+                                                        "17": 1, "23": 1, "20": roster - 9}},
+                "draftSettings": {"keeperCount": 3, "type": "SNAKE"},
+            },
+        },
+        "mDraftDetail": {"draftDetail": {"drafted": True, "inProgress": False, "picks": picks}},
+        "mRoster": {
+            "teams": [
+                {"id": t, "roster": {"entries": [entry(p, n) for tt, p, n in players if tt == t]}}
+                for t in range(1, teams + 1)
+            ]
+        },
+        "mTeam": {
+            "teams": [
+                {"id": t, "name": f"Stand-in Team {t}", "location": "Stand-in", "nickname": f"Team {t}",
+                 "abbrev": f"T{t}", "owners": ["{%08X}" % t]}
+                for t in range(1, teams + 1)
+            ],
+            "members": [{"id": "{%08X}" % t, "displayName": f"owner{t}"} for t in range(1, teams + 1)],
+        },
+    }
+
+
+def merge_views(payloads, views):
+    """Merge several view payloads into one league object, teams joined by id."""
+    out = {}
+    for v in views:
+        for key, value in payloads.get(v, {}).items():
+            if key == "teams" and "teams" in out:
+                by_id = {t["id"]: t for t in out["teams"]}
+                for t in value:
+                    by_id.setdefault(t["id"], {}).update(t)
+                out["teams"] = list(by_id.values())
+            else:
+                out[key] = value
+    return out
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, payloads, latency=0.0, jitter=0.0, fail_rate=0.0, stall_rate=0.0):
+        super().__init__(addr, Handler)
+        self.payloads = payloads
+        self.latency, self.jitter = latency, jitter
+        self.fail_rate, self.stall_rate = fail_rate, stall_rate
+        self.hits = Counter()
+        self._bodies = {}  # views -> (body, etag)
+        self._lock = threading.Lock()
+
+    def body(self, views):
+        key = tuple(views)
+        with self._lock:
+            if key not in self._bodies:
+                body = json.dumps(merge_views(self.payloads, views)).encode()
+                self._bodies[key] = (body, '"%s"' % hashlib.sha1(body).hexdigest()[:16])
+            return self._bodies[key]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like ESPN
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=()):
+        self.send_response(status)
+        for k, v in headers:
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        srv = self.server
+        url = urlparse(self.path)
+        if url.path == "/_stats":
+            return self._send(200, json.dumps(srv.hits).encode(), [("Content-Type", "application/json")])
+        if not LEAGUE_PATH.match(url.path):
+            return self._send(404, b'{"messages":["not found"]}', [("Content-Type", "application/json")])
+
+        views = parse_qs(url.query).get("view") or []
+        srv.hits["+".join(views) or "(none)"] += 1
+        time.sleep(max(0.0, srv.latency + random.uniform(-srv.jitter, srv.jitter)))
+        roll = random.random()
+        if roll < srv.stall_rate:
+            time.sleep(30)
+        elif roll < srv.stall_rate + srv.fail_rate:
+            return self._send(503, b'{"messages":["injected failure"]}', [("Content-Type", "application/json")])
+
+        body, etag = srv.body(views)
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, headers=[("ETag", etag)])
+        self._send(200, body, [("Content-Type", "application/json;charset=UTF-8"), ("ETag", etag)])
+
+
+def load_payloads(args):
+    payloads = synthetic_league(args.teams, args.roster)
+    if args.fixtures:
+        for v in VIEWS:
+            path = os.path.join(args.fixtures, f"{v}.json")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    payloads[v] = json.load(f)
+    return payloads
+
+
+def serve(args):
+    srv = StandIn(
+        (args.host, args.port), load_payloads(args),
+        args.latency, args.jitter, args.fail_rate, args.stall_rate,
+    )
+    print(f"ESPN stand-in on http://{args.host}:{srv.server_address[1]}", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def record(args):
+    """Save the four views of the configured league as fixtures."""
+    from dotenv import load_dotenv
+    from app.services.espn import EspnClient
+
+    load_dotenv()
+    cfg = {k: os.environ[k] for k in ("LEAGUE_ID", "ESPN_SWID", "ESPN_S2")}
+    season = int(os.environ.get("LAST_SEASON", "2024"))
+    client = EspnClient()
+    os.makedirs(args.out, exist_ok=True)
+    for v in VIEWS:
+        params = {"view": v}
+        if v == "mRoster" and args.scoring_period:
+            params["scoringPeriodId"] = str(args.scoring_period)
+        data = client.get_json(cfg, params, season)
+        with open(os.path.join(args.out, f"{v}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        print(f"{v}: saved")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8901)
+    s.add_argument("--teams", type=int, default=10)
+    s.add_argument("--roster", type=int, default=16)
+    s.add_argument("--latency", type=float, default=0.15, help="seconds per response")
+    s.add_argument("--jitter", type=float, default=0.05)
+    s.add_argument("--fail-rate", type=float, default=0.0)
+    s.add_argument("--stall-rate", type=float, default=0.0)
+    s.add_argument("--fixtures", help="directory of recorded <view>.json files")
+    r = sub.add_parser("record")
+    r.add_argument("--out", required=True)
+    r.add_argument("--scoring-period", type=int, default=17)
+    args = ap.parse_args()
+    serve(args) if args.cmd == "serve" else record(args)
+
+
+if __name__ == "__main__":
+    main()
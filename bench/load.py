@@ -0,0 +1,228 @@
+# bench/load.py
+# Concurrent load against the keeper API: /api/team_roster, /api/check and
+# /api/check_keeper_selection, reporting throughput and p50/p95/p99 latency.
+#
+# Against a running server:
+#   python bench/load.py --url http://127.0.0.1:5000 [--concurrency 16] [--duration 20]
+#
+# Or let it start the ESPN stand-in (bench/espn_standin.py) plus one server
+# per configuration, gunicorn (WORKERSxTHREADS) and/or the ASGI entry point
+# under uvicorn (WORKERS), and compare them:
+#   python bench/load.py --gunicorn 1x4 --gunicorn 2x4 --gunicorn 4x2 [--espn-latency 0.15]
+#   python bench/load.py --gunicorn 2x4 --uvicorn 2 --concurrency 200 \
+#       --app-env ESPN_CACHE_TTL=2 --app-env ESPN_CACHE_STALE_TTL=0 --app-env SHARED_SNAPSHOT_DIR=
+# (short cache TTLs keep requests waiting on the slow stand-in, which is where
+# sync threads run out)
+#
+# Extra args after -- go to the stand-in, e.g. -- --fail-rate 0.05 --teams 12
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return float("nan")
+    i = min(len(sorted_vals) - 1, max(0, round(p / 100 * (len(sorted_vals) - 1))))
+    return sorted_vals[i]
+
+
+def discover(url):
+    """(team keys, {team key: [player names]}) from the app itself."""
+    teams = [t["id"] for t in requests.get(f"{url}/api/teams", timeout=60).json()["teams"]]
+    rosters = {}
+    for key in teams:
+        r = requests.get(f"{url}/api/team_roster", params={"team": key}, timeout=60)
+        rosters[key] = [p["name"] for p in r.json().get("players", [])]
+    return teams, {k: v for k, v in rosters.items() if v}
+
+
+def make_requests(teams, rosters):
+    """Weighted request mix, as (label, method, path, json body) generators."""
+    def roster():
+        return "team_roster", "GET", f"/api/team_roster?team={random.choice(teams)}", None
+
+    def check():
+        key = random.choice(list(rosters))
+        return "check", "POST", "/api/check", {"name": random.choice(rosters[key]), "team_id": key}
+
+    def selection():
+        key = random.choice(list(rosters))
+        return "check_keeper_selection", "POST", "/api/check_keeper_selection", {
+            "name": random.choice(rosters[key]),
+            "team_id": key,
+            "current_keepers": [],
+        }
+
+    return [roster, check, check, selection]
+
+
+def run_load(url, concurrency, duration):
+    teams, rosters = discover(url)
+    if not rosters:
+        raise SystemExit("No rosters returned; is the app pointed at ESPN (or the stand-in)?")
+    mix = make_requests(teams, rosters)
+    samples = defaultdict(list)  # label -> [seconds]
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local, local_err = defaultdict(list), defaultdict(int)
+        while time.perf_counter() < stop_at:
+            label, method, path, body = random.choice(mix)()
+            t0 = time.perf_counter()
+            try:
+                r = session.request(method, url + path, json=body, timeout=60)
+                ok = r.status_code < 500
+            except requests.RequestException:
+                ok = False
+            local[label].append(time.perf_counter() - t0)
+            if not ok:
+                local_err[label] += 1
+        with lock:
+            for k, v in local.items():
+                samples[k].extend(v)
+            for k, v in local_err.items():
+                errors[k] += v
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    samples["all"] = [s for k in list(samples) for s in samples[k]]
+    errors["all"] = sum(errors.values())
+    return samples, errors, elapsed
+
+
+def report(title, samples, errors, elapsed):
+    print(f"\n{title}")
+    print(f"{'endpoint':24} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label in sorted(samples, key=lambda k: (k == "all", k)):
+        vals = sorted(samples[label])
+        print(
+            f"{label:24} {len(vals):>7} {errors.get(label, 0):>5} {len(vals) / elapsed:>8.1f} "
+            f"{percentile(vals, 50) * 1000:>8.1f} {percentile(vals, 95) * 1000:>8.1f} "
+            f"{percentile(vals, 99) * 1000:>8.1f}"
+        )
+
+
+def wait_ready(url, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{url} exited with {proc.returncode}")
+        try:
+            if requests.get(url, timeout=2).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} not ready after {timeout}s")
+
+
+def stop(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def spawn_and_run(args, standin_args):
+    standin = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "bench", "espn_standin.py"), "serve",
+         "--port", str(args.espn_port), "--latency", str(args.espn_latency), *standin_args],
+        cwd=ROOT,
+    )
+    espn_url = f"http://127.0.0.1:{args.espn_port}"
+    try:
+        wait_ready(espn_url + "/_stats", standin)
+        servers = []
+        for spec in args.gunicorn:
+            workers, threads = (int(x) for x in spec.lower().split("x"))
+            servers.append((
+                f"gunicorn --workers={workers} --threads={threads}",
+                ["gunicorn", "wsgi:app", "--preload", f"--workers={workers}", f"--threads={threads}",
+                 "--timeout=60", f"--bind=127.0.0.1:{args.app_port}", "--log-level=warning"],
+            ))
+        for workers in args.uvicorn:
+            servers.append((
+                f"uvicorn asgi:app --workers={workers}",
+                ["uvicorn", "asgi:app", f"--workers={workers}", f"--port={args.app_port}",
+                 "--log-level=warning", "--no-access-log"],
+            ))
+        for title, cmd in servers:
+            env = dict(
+                os.environ,
+                ESPN_API_HOSTS=espn_url,
+                LEAGUE_ID=os.environ.get("LEAGUE_ID", "1559665589"),
+                ESPN_SWID="{standin}",
+                ESPN_S2="standin",
+                SNAPSHOT_DIR=tempfile.mkdtemp(prefix="keeper-bench-"),
+                SHARED_SNAPSHOT_DIR=tempfile.mkdtemp(prefix="keeper-bench-shared-"),
+            )
+            env.update(kv.split("=", 1) for kv in args.app_env)
+            app_url = f"http://127.0.0.1:{args.app_port}"
+            app = subprocess.Popen(cmd, cwd=ROOT, env=env)
+            try:
+                wait_ready(app_url + "/api/keeper_limits", app)
+                before = requests.get(espn_url + "/_stats").json()
+                samples, errors, elapsed = run_load(app_url, args.concurrency, args.duration)
+                after = requests.get(espn_url + "/_stats").json()
+                upstream = sum(after.values()) - sum(before.values())
+                report(
+                    f"{title}  ({args.concurrency} clients, {elapsed:.1f}s, {upstream} ESPN requests)",
+                    samples, errors, elapsed,
+                )
+            finally:
+                stop(app)
+    finally:
+        stop(standin)
+
+
+def main():
+    argv = sys.argv[1:]
+    standin_args = argv[argv.index("--") + 1:] if "--" in argv else []
+    argv = argv[: argv.index("--")] if "--" in argv else argv
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", help="benchmark an already running app")
+    ap.add_argument("--gunicorn", action="append", default=[], metavar="WORKERSxTHREADS")
+    ap.add_argument("--uvicorn", action="append", default=[], type=int, metavar="WORKERS",
+                    help="the ASGI entry point (needs uvicorn and httpx)")
+    ap.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                    help="extra environment for the spawned servers")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=20)
+    ap.add_argument("--espn-latency", type=float, default=0.15)
+    ap.add_argument("--espn-port", type=int, default=8901)
+    ap.add_argument("--app-port", type=int, default=8902)
+    args = ap.parse_args(argv)
+
+    if args.url:
+        samples, errors, elapsed = run_load(args.url.rstrip("/"), args.concurrency, args.duration)
+        report(f"{args.url} ({args.concurrency} clients, {elapsed:.1f}s)", samples, errors, elapsed)
+    elif args.gunicorn or args.uvicorn:
+        spawn_and_run(args, standin_args)
+    else:
+        ap.error("give --url or at least one --gunicorn WORKERSxTHREADS / --uvicorn WORKERS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# bench/player_memory.py
+# Compare memory of player records plus the name/id lookup maps built from the
+# old dict-backed PlayerRec against the current slotted one with interned
+# names, for a synthetic league.
+#
+#   python bench/player_memory.py [--teams 10] [--roster 16] [--snapshots 4]
+#
+# --snapshots approximates several seasons/leagues (or rebuilt snapshots)
+# held by one worker at once.
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.keeper import PlayerRec  # noqa: E402
+
+
+class DictPlayerRec:
+    """PlayerRec as it was before __slots__."""
+
+    def __init__(self, player_id, name):
+        self.player_id = player_id
+        self.name = name
+        self.final_team_id = None
+        self.espn_team_id = None
+        self.draft_round = None
+        self.originally_undrafted = False
+        self.seasons_kept = 0
+        self.points = None
+
+
+def build(cls, teams, roster, snapshot, intern):
+    recs = []
+    for t in range(teams):
+        for i in range(roster):
+            pid = 4_000_000 + t * 100 + i
+            name = "".join(["Player ", str(pid), " Jr."])  # fresh str per snapshot, like JSON
+            rec = cls(pid, sys.intern(name) if intern else name)
+            rec.final_team_id = f"team{t}"
+            rec.espn_team_id = t + 1
+            rec.draft_round = i + 1 if i < 14 else None
+            rec.originally_undrafted = rec.draft_round is None
+            rec.points = float(pid % 300)
+            recs.append(rec)
+    return recs
+
+
+def measure(cls, teams, roster, snapshots, intern, with_maps):
+    tracemalloc.start()
+    keep = []
+    for s in range(snapshots):
+        recs = build(cls, teams, roster, s, intern)
+        keep.append(recs)
+        if with_maps:  # PlayerIndex.by_name / by_id
+            lower = sys.intern if intern else str
+            keep.append({lower(r.name.lower()): r for r in recs})
+            keep.append({r.player_id: r for r in recs})
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--teams", type=int, default=10)
+    ap.add_argument("--roster", type=int, default=16)
+    ap.add_argument("--snapshots", type=int, default=4)
+    args = ap.parse_args()
+    n = args.teams * args.roster * args.snapshots
+
+    print(f"{n} player records ({args.snapshots} snapshots x {args.teams} teams x {args.roster})")
+    print(f"{'representation':38} {'records':>10} {'+ maps':>10} {'B/player':>9}")
+    for label, cls, intern in (
+        ("dict-backed PlayerRec (before)", DictPlayerRec, False),
+        ("slotted PlayerRec + interned names", PlayerRec, True),
+    ):
+        recs = measure(cls, args.teams, args.roster, args.snapshots, intern, False)
+        full = measure(cls, args.teams, args.roster, args.snapshots, intern, True)
+        print(f"{label:38} {recs / 1024:>8.0f}KB {full / 1024:>8.0f}KB {full / n:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
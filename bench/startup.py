@@ -0,0 +1,117 @@
+# bench/startup.py
+# Cold-start report: where `import wsgi` spends its time (python -X importtime,
+# per module and per top-level package), and how long the first requests take
+# after boot, once with an empty snapshot dir and once with the file the first
+# boot persisted (what a scaled-to-zero instance finds on wake-up).
+#
+#   python bench/startup.py [--top 20] [--standin] [--espn-latency 0.15]
+#
+# Without --standin the app talks to whatever ESPN_API_HOSTS/LEAGUE_ID the
+# environment (or .env) configures; with it, bench/espn_standin.py is started.
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+from load import ROOT, stop, wait_ready
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Runs in a fresh interpreter: boot, then the page's first two API calls.
+FIRST_REQUESTS = """
+import json, time
+t0 = time.perf_counter()
+import wsgi
+boot = time.perf_counter() - t0
+client = wsgi.app.test_client()
+t1 = time.perf_counter()
+teams = client.get("/api/teams").get_json()["teams"]
+t2 = time.perf_counter()
+client.get("/api/team_roster", query_string={"team": teams[0]["id"]})
+t3 = time.perf_counter()
+print(json.dumps({"boot": boot, "/api/teams": t2 - t1, "/api/team_roster": t3 - t2}))
+"""
+
+
+def import_times(env):
+    """[(self us, cumulative us, depth, module)] for `import wsgi`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import wsgi"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            rows.append((int(m[1]), int(m[2]), len(m[3]) // 2, m[4]))
+    return rows
+
+
+def report_imports(rows, top):
+    wsgi = next((cum for _, cum, _, name in rows if name == "wsgi"), 0)
+    print(f"import wsgi: {wsgi / 1000:.1f} ms "
+          f"(all imports incl. interpreter start-up: {sum(s for s, *_ in rows) / 1000:.1f} ms)")
+
+    by_package = defaultdict(int)
+    for self_us, _, _, name in rows:
+        by_package[name.split(".")[0]] += self_us
+    print(f"\n{'package':32} {'self ms':>8}")
+    for name, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{name:32} {us / 1000:>8.1f}")
+
+    print(f"\n{'module':48} {'self ms':>8} {'cumul ms':>9}")
+    for self_us, cum, _, name in sorted(rows, key=lambda r: -r[1])[:top]:
+        print(f"{name:48} {self_us / 1000:>8.1f} {cum / 1000:>9.1f}")
+
+
+def first_requests(env):
+    proc = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUESTS],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--standin", action="store_true", help="start bench/espn_standin.py")
+    ap.add_argument("--espn-latency", type=float, default=0.15)
+    ap.add_argument("--espn-port", type=int, default=8901)
+    args = ap.parse_args()
+
+    env = dict(os.environ, SNAPSHOT_DIR=tempfile.mkdtemp(prefix="keeper-startup-"))
+    standin = None
+    if args.standin:
+        standin = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "bench", "espn_standin.py"), "serve",
+             "--port", str(args.espn_port), "--latency", str(args.espn_latency)],
+            cwd=ROOT, stdout=subprocess.DEVNULL,
+        )
+        espn_url = f"http://127.0.0.1:{args.espn_port}"
+        env.update(ESPN_API_HOSTS=espn_url, ESPN_SWID="{standin}", ESPN_S2="standin",
+                   LEAGUE_ID=env.get("LEAGUE_ID", "1559665589"))
+    try:
+        if standin:
+            wait_ready(espn_url + "/_stats", standin)
+        report_imports(import_times(dict(env, WARMUP_ON_BOOT="0")), args.top)
+
+        print(f"\n{'first requests (ms)':32} {'boot':>8} {'/api/teams':>11} {'/api/team_roster':>17}")
+        for label, warmup in (("no warm-up, empty dir", "0"), ("warm-up, empty dir", "1"),
+                              ("warm-up, persisted snapshot", "1")):
+            if label.endswith("empty dir"):
+                shared = tempfile.mkdtemp(prefix="keeper-shared-")
+            t = first_requests(dict(env, WARMUP_ON_BOOT=warmup, SHARED_SNAPSHOT_DIR=shared))
+            print(f"{label:32} {t['boot'] * 1000:>8.1f} {t['/api/teams'] * 1000:>11.1f} "
+                  f"{t['/api/team_roster'] * 1000:>17.1f}")
+    finally:
+        if standin:
+            stop(standin)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# snapshot_season.py
+# Download LAST_SEASON's league data from ESPN into SNAPSHOT_DIR so that, with
+# SEASON_FINALIZED=1, the app serves keeper checks without calling ESPN. That
+# includes the earlier seasons' drafts keep_history reads (AUTO_SEASONS_KEPT),
+# which building the player index fetches and persists.
+import sys
+from wsgi import app
+from app.config.leagues import tenant_config
+from app.services.espn import build_player_index, fetch_league_blob, snapshot_store
+
+cfg = dict(tenant_config(app.config), SEASON_FINALIZED=True)
+store = snapshot_store(cfg)
+if store is None:
+    sys.exit("SNAPSHOT_DIR is not set.")
+if "--refresh" in sys.argv:
+    store.clear(cfg["LEAGUE_ID"], cfg["LAST_SEASON"])
+
+blob = fetch_league_blob(cfg)
+idx = build_player_index(cfg, blob)
+teams = (blob["roster"] or {}).get("teams") or []
+print(
+    f"Saved season {cfg['LAST_SEASON']} for league {cfg['LEAGUE_ID']} to {store.root}: "
+    f"{len(teams)} teams, {len(idx.by_id)} players, "
+    f"final scoring period {blob['final_scoring_period']}."
+)
+print("Set SEASON_FINALIZED=1 in the environment to serve from these files.")
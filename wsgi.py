@@ -1,5 +1,9 @@
 import os
 import sys
+import tempfile
+import time
+
+BOOT_STARTED = time.perf_counter()
 
 # Add the current directory to Python path
 sys.path.insert(0, os.getcwd())
@@ -23,8 +27,73 @@ app.config.update(
     ESPN_S2=os.environ.get("ESPN_S2"),
     LAST_SEASON=int(os.environ.get("LAST_SEASON", "2024")),
     COMMISSIONER_EMAIL=os.environ.get("COMMISSIONER_EMAIL", "dcosta154@gmail.com"),
+    # ESPN snapshot cache: serve fresh for TTL seconds, then serve stale while
+    # refreshing in the background for up to STALE_TTL more seconds
+    ESPN_CACHE_TTL=int(os.environ.get("ESPN_CACHE_TTL", "300")),
+    ESPN_CACHE_STALE_TTL=int(os.environ.get("ESPN_CACHE_STALE_TTL", "3600")),
+    # pooled ESPN client: keep-alive connections per host, retries on 429/5xx
+    ESPN_POOL_SIZE=int(os.environ.get("ESPN_POOL_SIZE", "8")),
+    ESPN_MAX_RETRIES=int(os.environ.get("ESPN_MAX_RETRIES", "2")),
+    ESPN_TIMEOUT=float(os.environ.get("ESPN_TIMEOUT", "25")),
+    # total seconds one request may spend waiting on ESPN, split across views
+    # and hosts (keep it under gunicorn's --timeout); 0 = per-call timeouts only
+    ESPN_REQUEST_BUDGET=float(os.environ.get("ESPN_REQUEST_BUDGET", "20")),
+    # after this many ESPN calls fail in a row, fail fast for ESPN_BREAKER_RESET seconds
+    ESPN_BREAKER_FAILURES=int(os.environ.get("ESPN_BREAKER_FAILURES", "3")),
+    ESPN_BREAKER_RESET=float(os.environ.get("ESPN_BREAKER_RESET", "30")),
+    # background re-poll interval (seconds) per ESPN view for the live season;
+    # unchanged payloads keep their snapshot version. Empty disables polling.
+    ESPN_REFRESH_INTERVALS={
+        view.strip(): float(secs)
+        for view, _, secs in (
+            item.partition("=")
+            for item in os.environ.get(
+                "ESPN_REFRESH_INTERVALS", "mRoster=300,mSettings=900,mDraftDetail=900,mTeam=3600"
+            ).split(",")
+            if item.strip()
+        )
+    },
+    # request mSettings+mDraftDetail+mTeam together (falls back per view)
+    ESPN_COMBINED_VIEWS=os.environ.get("ESPN_COMBINED_VIEWS", "1") == "1",
+    # when ESPN omits finalScoringPeriod, probe late periods instead of assuming 19
+    ESPN_PROBE_FINAL_PERIOD=os.environ.get("ESPN_PROBE_FINAL_PERIOD", "0") == "1",
+    ESPN_PROBE_WORKERS=int(os.environ.get("ESPN_PROBE_WORKERS", "4")),
+    # finalized seasons are read from / written to gzipped snapshots on disk
+    SNAPSHOT_DIR=os.environ.get("SNAPSHOT_DIR", "data/snapshots"),
+    SEASON_FINALIZED=os.environ.get("SEASON_FINALIZED", "0") == "1",
+    # derive seasons_kept from past drafts' keeper flags (overrides still win);
+    # FIRST_SEASON pulls the league's whole history instead of just the rule window
+    AUTO_SEASONS_KEPT=os.environ.get("AUTO_SEASONS_KEPT", "1") == "1",
+    FIRST_SEASON=int(os.environ.get("FIRST_SEASON") or 0) or None,
+    # workers share one player table through files here; one elected worker
+    # fetches from ESPN and publishes new versions. Empty = every worker fetches.
+    SHARED_SNAPSHOT_DIR=os.environ.get(
+        "SHARED_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "keeper-shared")
+    ),
+    SHARED_PUBLISH_INTERVAL=float(os.environ.get("SHARED_PUBLISH_INTERVAL", "30")),
+    # extra leagues served via ?league=<id>&season=<year> (see app/config/leagues.example.json)
+    LEAGUES_FILE=os.environ.get("LEAGUES_FILE", ""),
+    TENANT_CACHE_SIZE=int(os.environ.get("TENANT_CACHE_SIZE", "32")),
+    # gzip (or brotli, if installed) text responses at least this big; 0 disables
+    HTTP_COMPRESS_MIN_BYTES=int(os.environ.get("HTTP_COMPRESS_MIN_BYTES", "1024")),
+    # /api/events: how often feeds check for a new snapshot, and (gunicorn only,
+    # where each stream holds a thread) streams per worker and their lifetime;
+    # 0 streams (the default) turns live updates off there, asgi:app has them
+    EVENTS_POLL_INTERVAL=float(os.environ.get("EVENTS_POLL_INTERVAL", "5")),
+    EVENTS_MAX_STREAMS=int(os.environ.get("EVENTS_MAX_STREAMS", "0")),
+    EVENTS_MAX_STREAM_SECONDS=float(os.environ.get("EVENTS_MAX_STREAM_SECONDS", "300")),
+    # load ESPN data + player index at import so --preload workers fork hot
+    WARMUP_ON_BOOT=os.environ.get("WARMUP_ON_BOOT", "1") == "1",
+    WARMUP_TIMEOUT=float(os.environ.get("WARMUP_TIMEOUT", "20")),
 )
 
+# a broken leagues file fails the boot; later edits that break it are logged and
+# the last good version keeps being served (see league_overlays)
+if app.config["LEAGUES_FILE"]:
+    from app.config.leagues import load_leagues
+
+    load_leagues(app.config["LEAGUES_FILE"])
+
 # Import and register blueprint
 try:
     from app.routes import bp as main_bp
@@ -35,5 +104,22 @@ except ImportError:
     def index():
         return "Keeper App - Import Error. Check logs."
 
+if app.config["WARMUP_ON_BOOT"] and app.config["LEAGUE_ID"]:
+    import gc
+    from app.config.leagues import tenant_config
+    from app.services.espn import warm_up
+
+    # the default league as requests see it (leagues-file entry included)
+    if warm_up(tenant_config(app.config), app.config["WARMUP_TIMEOUT"]):
+        app.logger.info("Warm-up complete; league snapshot and player index cached.")
+    else:
+        app.logger.warning("Warm-up did not finish; ESPN data will load on first request.")
+    # move everything loaded so far out of GC tracking so forked workers don't
+    # dirty (and copy) those pages during collections
+    gc.freeze()
+
+# see bench/startup.py for a per-module breakdown
+app.logger.info("Booted in %.0f ms.", (time.perf_counter() - BOOT_STARTED) * 1000)
+
 if __name__ == "__main__":
     app.run()